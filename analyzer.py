@@ -0,0 +1,322 @@
+# coding=utf-8
+import re
+import string
+
+from stemmer import EnglishStemmer
+
+"""
+Analyseurs de texte utilisés par l'index: tokenisation, stop words et stemming.
+
+Deux analyseurs sont disponibles:
+    - "nltk": tokenisation, stop words et stemming de NLTK. NLTK n'est importé qu'a la
+      premiere analyse (et non au chargement du module), car son import est long.
+    - "builtin": meme traitement en pur python, sans NLTK: tokenizer a base de regex
+      (portage de celui de NLTK), liste de stop words anglais de NLTK incluse ci dessous
+      et stemmer Snowball de stemmer.py. Démarrage quasi instantané.
+
+Dans les deux cas, les stop words sont calculés une seule fois et les mots déja stemmés sont
+gardés en cache.
+"""
+
+# Stop words anglais de NLTK (nltk.corpus.stopwords.words("english"))
+ENGLISH_STOP_WORDS = [
+    "i", "me", "my", "myself", "we", "our", "ours", "ourselves", "you", "you're", "you've",
+    "you'll", "you'd", "your", "yours", "yourself", "yourselves", "he", "him", "his", "himself",
+    "she", "she's", "her", "hers", "herself", "it", "it's", "its", "itself", "they", "them",
+    "their", "theirs", "themselves", "what", "which", "who", "whom", "this", "that", "that'll",
+    "these", "those", "am", "is", "are", "was", "were", "be", "been", "being", "have", "has",
+    "had", "having", "do", "does", "did", "doing", "a", "an", "the", "and", "but", "if", "or",
+    "because", "as", "until", "while", "of", "at", "by", "for", "with", "about", "against",
+    "between", "into", "through", "during", "before", "after", "above", "below", "to", "from",
+    "up", "down", "in", "out", "on", "off", "over", "under", "again", "further", "then", "once",
+    "here", "there", "when", "where", "why", "how", "all", "any", "both", "each", "few", "more",
+    "most", "other", "some", "such", "no", "nor", "not", "only", "own", "same", "so", "than",
+    "too", "very", "s", "t", "can", "will", "just", "don", "don't", "should", "should've", "now",
+    "d", "ll", "m", "o", "re", "ve", "y", "ain", "aren", "aren't", "couldn", "couldn't",
+    "didn", "didn't", "doesn", "doesn't", "hadn", "hadn't", "hasn", "hasn't", "haven",
+    "haven't", "isn", "isn't", "ma", "mightn", "mightn't", "mustn", "mustn't", "needn",
+    "needn't", "shan", "shan't", "shouldn", "shouldn't", "wasn", "wasn't", "weren", "weren't",
+    "won", "won't", "wouldn", "wouldn't",
+]
+
+
+class NLTKAnalyzer(object):
+    '''
+    Analyseur NLTK (word_tokenize, stopwords anglais, SnowballStemmer), importé a la premiere utilisation
+
+    Arguments:
+        - (list) stop_words: stop words a ajouter a ceux de NLTK et a la ponctuation
+    '''
+
+    def __init__(self, stop_words):
+        self._extra_stop_words = stop_words
+        self._stop_words = None
+        self._stemmer = None
+        self._stems = {}  # cache {mot: racine}
+
+    @property
+    def stop_words(self):
+        if self._stop_words is None:
+            from nltk.corpus import stopwords
+            self._stop_words = set(self._extra_stop_words + list(string.punctuation)
+                                   + stopwords.words("english"))
+        return self._stop_words
+
+    def tokenize(self, text):
+        from nltk import word_tokenize
+        return word_tokenize(text, language="english")
+
+    def stem(self, word):
+        if word not in self._stems:
+            if self._stemmer is None:
+                from nltk.stem.snowball import SnowballStemmer
+                self._stemmer = SnowballStemmer(language="english")
+            self._stems[word] = self._stemmer.stem(word)
+        return self._stems[word]
+
+
+class BuiltinAnalyzer(object):
+    '''
+    Analyseur en pur python, donnant les memes mots que NLTKAnalyzer sans importer NLTK
+
+    Arguments:
+        - (list) stop_words: stop words a ajouter a ceux de NLTK et a la ponctuation
+    '''
+
+    def __init__(self, stop_words):
+        self.stop_words = set(stop_words + list(string.punctuation) + ENGLISH_STOP_WORDS)
+        self._stemmer = EnglishStemmer()
+
+    def tokenize(self, text):
+        return [token for sentence in split_sentences(text) for token in tokenize_sentence(sentence)]
+
+    def stem(self, word):
+        return self._stemmer.stem(word)
+
+
+ANALYZERS = {'nltk': NLTKAnalyzer, 'builtin': BuiltinAnalyzer}
+_analyzers = {}  # analyseurs déja créés {nom: analyseur}
+
+
+def get_analyzer(name, stop_words):
+    '''
+    Retourne l'analyseur `name` ("nltk" ou "builtin"). Un seul analyseur de chaque type est créé,
+    partagé par tous les index (et donc son cache de racines).
+    '''
+    if name not in ANALYZERS:
+        raise ValueError("Unsupported analyzer: %s" % name)
+    if name not in _analyzers:
+        _analyzers[name] = ANALYZERS[name](stop_words)
+    return _analyzers[name]
+
+
+########################################
+# DECOUPAGE EN PHRASES ET TOKENISATION #
+########################################
+
+# Portage du découpage en phrases de nltk.tokenize.punkt (PunktSentenceTokenizer),
+# sans paramètres appris (aucune abréviation, collocation ni contexte orthographique connu)
+NON_WORD = u'(?:[)";}\\]*:@\'({\\[‘’“”«»!?])'
+MULTI_CHAR = r'(?:\-{2,}|\.{2,}|(?:\.\s){2,}\.)'
+WORD_START = r'[^\(\"\`{\[:;&\#\*@\)}\]\-,]'
+PUNKT_WORD = re.compile(
+    u'(%(MultiChar)s|(?=%(WordStart)s)\\S+?(?=\\s|$|%(NonWord)s|%(MultiChar)s|,(?=$|\\s|%(NonWord)s|%(MultiChar)s))|\\S)'
+    % {'NonWord': NON_WORD, 'MultiChar': MULTI_CHAR, 'WordStart': WORD_START},
+    re.UNICODE
+)
+# Fin de phrase possible, suivie d'une ponctuation ou d'un espace et du mot suivant
+PERIOD_CONTEXT = re.compile(u'[.?!](?=(?P<after_tok>%s|\\s+(?P<next_tok>\\S+)))' % NON_WORD, re.UNICODE)
+# Ponctuation fermante a rattacher a la phrase précédente
+BOUNDARY_REALIGNMENT = re.compile(u'["\')\\]}‘’“”«»]+?(?:\\s+|(?=--)|$)', re.MULTILINE | re.UNICODE)
+NUMERIC = re.compile(r'^-?[\.,]?\d[\d,\.-]*\.?$')
+INITIAL = re.compile(r'[^\W\d]\.$', re.UNICODE)
+SENTENCE_END_CHARS = ('.', '?', '!')
+PUNCTUATION_TOKENS = tuple(';:,.!?')
+
+
+def split_sentences(text):
+    '''
+    Découpe le texte en phrases, comme sent_tokenize de NLTK (utilisé par word_tokenize)
+    avec un modèle Punkt vide:
+        - chaque ".", "?" ou "!" suivi d'un espace ou d'une ponctuation est une fin de phrase possible
+        - c'est une fin de phrase si le contexte (mot précédent et suivant) contient un mot
+          terminé par un point (ni points de suspension, ni initiale ou nombre suivis d'un mot
+          en minuscule ou d'une ponctuation), "?" ou "!", suivi d'un autre mot
+        - la ponctuation fermante qui suit une fin de phrase reste dans la phrase
+    '''
+    slices = []
+    last_break = 0
+    for match, context in _potential_end_contexts(text):
+        if _contains_sentence_break(context):
+            slices.append((last_break, match.end()))
+            last_break = match.start('next_tok') if match.group('next_tok') else match.end()
+    slices.append((last_break, len(text.rstrip())))
+
+    sentences = []
+    realign = 0
+    for i, (start, stop) in enumerate(slices):
+        start += realign
+        realignment = None
+        if i + 1 < len(slices):
+            next_start, next_stop = slices[i + 1]
+            realignment = BOUNDARY_REALIGNMENT.match(text[next_start:next_stop])
+        if realignment:
+            sentences.append(text[start:next_start + len(realignment.group(0).rstrip())])
+            realign = realignment.end()
+        else:
+            realign = 0
+            if text[start:stop]:
+                sentences.append(text[start:stop])
+    return sentences
+
+
+def _potential_end_contexts(text):
+    '''
+    Génère les fins de phrase possibles du texte avec leur contexte
+    (mot précédent, ponctuation de fin et ce qui suit)
+    Quand deux fins possibles se suivent dans un meme mot ("!!!"), seule la derniere est gardée
+    '''
+    previous_slice = (0, 0)
+    previous_match = None
+    for match in PERIOD_CONTEXT.finditer(text):
+        before_text = text[previous_slice[1]:match.start()]
+        word_start = _last_whitespace_index(before_text)
+        if word_start:
+            word_start += previous_slice[1] + 1
+        else:
+            word_start = previous_slice[0]
+        if previous_match and previous_slice[1] <= word_start:
+            yield previous_match, _context(text, previous_slice, previous_match)
+        previous_match = match
+        previous_slice = (word_start, match.start())
+    if previous_match:
+        yield previous_match, _context(text, previous_slice, previous_match)
+
+
+def _context(text, word_slice, match):
+    return text[word_slice[0]:word_slice[1]] + match.group() + match.group('after_tok')
+
+
+def _last_whitespace_index(text):
+    for i in range(len(text) - 1, -1, -1):
+        if text[i] in string.whitespace:
+            return i
+    return 0
+
+
+def _contains_sentence_break(text):
+    '''
+    Indique si un mot du texte (autre que le dernier) est une fin de phrase
+    '''
+    tokens = [token for line in text.split('\n') for token in PUNKT_WORD.findall(line)]
+    for token, next_token in zip(tokens, tokens[1:]):
+        if _is_sentence_break(token, next_token):
+            return True
+    return False
+
+
+def _is_sentence_break(token, next_token):
+    '''
+    Indique si `token` (suivi de `next_token`) est une fin de phrase
+    '''
+    if token in SENTENCE_END_CHARS:
+        return True
+    # Points de suspension, ou mot sans point final
+    if not token.endswith('.') or token.endswith('..'):
+        return False
+    # Une initiale ou un nombre (1., 2.) n'est pas une fin de phrase si le mot suivant
+    # ne peut pas commencer une phrase (minuscule ou ponctuation)
+    word_type = NUMERIC.sub('##number##', token.lower())
+    if INITIAL.match(token) or word_type == '##number##':
+        if next_token in PUNCTUATION_TOKENS or next_token[0].islower():
+            return False
+        # Initiale suivie d'une majuscule (J. Bach): pas une fin de phrase
+        if INITIAL.match(token) and next_token[0].isupper():
+            return False
+    return True
+
+
+# Portage des regex de nltk.tokenize.destructive.NLTKWordTokenizer
+STARTING_QUOTES = [
+    (re.compile(u"([«“‘„]|[`]+)", re.U), r" \1 "),
+    (re.compile(r'^\"'), r"``"),
+    (re.compile(r"(``)"), r" \1 "),
+    (re.compile(r"([ \(\[{<])(\"|\'{2})"), r"\1 `` "),
+    (re.compile(r"(?i)(?<!\w)(\')(?!(?:re|ve|ll|m|t|s|d|n)\b)(?=\w)", re.U), r"\1 "),
+]
+ENDING_QUOTES = [
+    (re.compile(u"([»”’])", re.U), r" \1 "),
+    (re.compile(r"''"), " '' "),
+    (re.compile(r'"'), " '' "),
+    (re.compile(r"\s+"), " "),
+    (re.compile(r"([^' ])('[sS]|'[mM]|'[dD]|') "), r"\1 \2 "),
+    (re.compile(r"([^' ])('ll|'LL|'re|'RE|'ve|'VE|n't|N'T) "), r"\1 \2 "),
+]
+PUNCTUATION = [
+    (re.compile(u'([^\\.])(\\.)([\\]\\)}>"\'»”’ ]*)\\s*$', re.U), r"\1 \2 \3 "),
+    (re.compile(r"([:,])([^\d])"), r" \1 \2"),
+    (re.compile(r"([:,])$"), r" \1 "),
+    (re.compile(r"\.{2,}", re.U), r" \g<0> "),
+    (re.compile(r"[;@#$%&]"), r" \g<0> "),
+    (re.compile(u"[‒-―]", re.U), r" \g<0> "),
+    (re.compile(r'([^\.])(\.)([\]\)}>"\']*)\s*$'), r"\1 \2\3 "),
+    (re.compile(r"[?!]"), r" \g<0> "),
+    (re.compile(r"([^'])' "), r"\1 ' "),
+    (re.compile(r"[*]", re.U), r" \g<0> "),
+]
+PARENS_BRACKETS = (re.compile(r"[\]\[\(\)\{\}\<\>]"), r" \g<0> ")
+DOUBLE_DASHES = (re.compile(r"--"), r" -- ")
+CONTRACTIONS2 = [re.compile(pattern) for pattern in [
+    r"(?i)\b(can)(?#X)(not)\b", r"(?i)\b(d)(?#X)('ye)\b", r"(?i)\b(gim)(?#X)(me)\b",
+    r"(?i)\b(gon)(?#X)(na)\b", r"(?i)\b(got)(?#X)(ta)\b", r"(?i)\b(lem)(?#X)(me)\b",
+    r"(?i)\b(more)(?#X)('n)\b", r"(?i)\b(wan)(?#X)(na)(?=\s)",
+]]
+CONTRACTIONS3 = [re.compile(r"(?i) ('t)(?#X)(is)\b"), re.compile(r"(?i) ('t)(?#X)(was)\b")]
+
+
+def tokenize_sentence(text):
+    '''
+    Tokenise une phrase (meme résultat que NLTKWordTokenizer().tokenize)
+    '''
+    for regexp, substitution in STARTING_QUOTES:
+        text = regexp.sub(substitution, text)
+    for regexp, substitution in PUNCTUATION:
+        text = regexp.sub(substitution, text)
+    regexp, substitution = PARENS_BRACKETS
+    text = regexp.sub(substitution, text)
+    regexp, substitution = DOUBLE_DASHES
+    text = regexp.sub(substitution, text)
+
+    text = " " + text + " "
+    for regexp, substitution in ENDING_QUOTES:
+        text = regexp.sub(substitution, text)
+    for regexp in CONTRACTIONS2 + CONTRACTIONS3:
+        text = regexp.sub(r" \1 \2 ", text)
+    return text.split()
+
+
+# Les guillemets sont transformés par la tokenisation: `` et '' peuvent venir d'un "
+QUOTE_TOKENS = ("``", "''")
+
+
+def token_spans(text, tokens):
+    '''
+    Retourne la position (début, fin) dans `text` de chacun des tokens obtenus en le tokenisant
+    (les tokens sont cherchés dans l'ordre, chacun après la fin du précédent).
+    Un token introuvable (cas limite de tokenisation) a une position vide: (début, début)
+    '''
+    spans = []
+    position = 0
+    for token in tokens:
+        start = text.find(token, position)
+        end = start + len(token)
+        if token in QUOTE_TOKENS:
+            quote = text.find('"', position)
+            if quote != -1 and (start == -1 or quote < start):
+                start, end = quote, quote + 1
+        if start == -1:
+            spans.append((position, position))
+            continue
+        spans.append((start, end))
+        position = end
+    return spans
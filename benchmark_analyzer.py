@@ -0,0 +1,63 @@
+# coding=utf-8
+
+# Benchmark des analyseurs de texte (cf analyzer.py)
+
+# Pour chaque analyseur ("nltk" et "builtin"):
+#   - temps de démarrage a froid: lancement d'un nouvel interpreteur python, import de l'index
+#     et processing d'une premiere query (médiane sur plusieurs lancements)
+#   - temps d'indexation de la collection
+# Puis on compare, document par document et query par query, les mots obtenus avec les deux
+# analyseurs (taux de documents / queries donnant exactement les memes mots)
+
+import subprocess
+import sys
+import time
+
+from collection import CACMCollection
+from index import Index
+from evaluation_utils import time_func, get_queries
+
+ANALYZERS = ["nltk", "builtin"]
+RUNS = 5
+
+# Script lancé dans un nouvel interpreteur pour mesurer le démarrage a froid
+COLD_START = (
+    "from index import Index\n"
+    "from documents import QueryDocument\n"
+    "Index([QueryDocument('time sharing operating systems')], analyzer='%s')\n"
+)
+
+
+def cold_start_time(script):
+    '''
+    Temps médian de lancement d'un nouvel interpreteur python executant `script`
+    '''
+    times = []
+    for _ in range(RUNS):
+        start = time.time()
+        subprocess.check_call([sys.executable, "-c", script])
+        times.append(time.time() - start)
+    return sorted(times)[len(times) // 2]
+
+
+collection = CACMCollection()
+queries = get_queries()
+
+print("analyseur   démarrage a froid (s)   indexation (s)")
+print("(python)    %.3f" % cold_start_time("pass"))
+indexes = {}
+for analyzer in ANALYZERS:
+    startup_time = cold_start_time(COLD_START % analyzer)
+    index_time, indexes[analyzer] = time_func(Index, collection.documents, False, analyzer)
+    print("%-11s %.3f                   %.3f" % (analyzer, startup_time, index_time))
+
+# Comparaison des mots obtenus
+nltk_index, builtin_index = indexes["nltk"], indexes["builtin"]
+texts = [("documents", [document.text for document in collection.documents]),
+         ("queries", list(queries.values()))]
+print("\n")
+for name, contents in texts:
+    identical = sum(1 for text in contents
+                    if nltk_index._text_to_words(text) == builtin_index._text_to_words(text))
+    print("%s identiques: %s / %s (%.2f %%)"
+          % (name, identical, len(contents), 100. * identical / len(contents)))
@@ -0,0 +1,56 @@
+# coding=utf-8
+
+# Benchmark de la recherche approchée par cluster pruning (cf cluster_pruning.py)
+
+# Pour les queries de reference de la collection, on compare la recherche vectorielle exacte
+# et la recherche approchée pour differents nombres de clusters sondés (probes):
+#   - temps de construction des clusters
+#   - temps de recherche moyen et accélération par rapport a la recherche exacte
+#   - MAP et perte de MAP par rapport a la recherche exacte
+
+from collection import CACMCollection
+from index import Index
+from vectorial_search import vectorial_search
+from cluster_pruning import ClusterPruningIndex, cluster_pruning_search
+from evaluation_utils import time_func, get_queries, get_expected_results, evaluate_runs
+from evaluation_utils import average, average_measures
+
+# Ponderation donnant les meilleurs resultats (cf evaluation.py)
+WEIGHT_TYPE = "tf_idf_log_normalized"
+PROBES = [1, 2, 4, 8, 16]
+
+collection = CACMCollection()
+index = Index(collection.documents)
+queries = get_queries()
+expected_results = get_expected_results()
+
+
+def run_queries(search, *args):
+    '''
+    Lance la recherche sur toutes les queries.
+    Renvoie un couple (temps moyen, {query_id: ids des documents trouvés})
+    '''
+    times = []
+    runs = {}
+    for query_id, query in queries.items():
+        search_time, search_results = time_func(search, query, *args)
+        times.append(search_time)
+        runs[query_id] = [result.doc_id for result in search_results]
+    return average(times), runs
+
+
+# Recherche exacte (les vecteurs des documents sont mis en cache avant de chronometrer)
+index.get_document_vectors(WEIGHT_TYPE)
+exact_time, exact_runs = run_queries(vectorial_search, index, WEIGHT_TYPE)
+exact_map = average_measures(evaluate_runs(exact_runs, expected_results))['average_precision']
+
+build_time, cluster_index = time_func(ClusterPruningIndex, index, WEIGHT_TYPE)
+print("Construction de %s clusters: %s s" % (cluster_index.clusters_count, build_time))
+print("\n")
+print("probes   temps moyen (s)   acceleration   MAP      perte de MAP")
+print("exact    %.5f           x1.0           %.4f   -" % (exact_time, exact_map))
+for probes in PROBES:
+    search_time, runs = run_queries(cluster_pruning_search, cluster_index, probes)
+    map_ = average_measures(evaluate_runs(runs, expected_results))['average_precision']
+    print("%-8s %.5f           x%-12.1f  %.4f   %.4f"
+          % (probes, search_time, exact_time / search_time, map_, exact_map - map_))
@@ -0,0 +1,65 @@
+# coding=utf-8
+
+# Benchmark du stockage quantifié des vecteurs de documents (cf quantization.py)
+
+# Pour chaque précision des poids, on compare a la recherche vectorielle sur les vecteurs
+# de l'index (dicts de floats python):
+#   - taille en mémoire des poids et octets par poids
+#   - temps de recherche moyen sur les queries de reference
+#   - MAP et écart de MAP, et proportion de queries dont le top 10 est inchangé
+
+import sys
+
+from collection import CACMCollection
+from index import Index
+from vectorial_search import vectorial_search
+from quantization import QuantizedVectors, quantized_search
+from evaluation_utils import time_func, get_queries, get_expected_results, evaluate_runs
+from evaluation_utils import average, average_measures
+
+# Ponderation donnant les meilleurs resultats (cf evaluation.py)
+WEIGHT_TYPE = "tf_idf_log_normalized"
+PRECISIONS = ["float64", "float32", "uint16", "int8"]
+
+collection = CACMCollection()
+index = Index(collection.documents)
+queries = get_queries()
+expected_results = get_expected_results()
+
+
+def run_queries(search, *args):
+    '''
+    Lance la recherche sur toutes les queries.
+    Renvoie un couple (temps moyen, {query_id: ids des documents trouvés})
+    '''
+    times = []
+    runs = {}
+    for query_id, query in queries.items():
+        search_time, search_results = time_func(search, query, *args)
+        times.append(search_time)
+        runs[query_id] = [result.doc_id for result in search_results]
+    return average(times), runs
+
+
+# Recherche sur les vecteurs de l'index (mis en cache avant de chronometrer)
+vectors = index.get_document_vectors(WEIGHT_TYPE)
+weights_count = sum(len(vector) for vector in vectors)
+# Taille des dicts et des floats (les ids de mots sont partagés avec les indexs)
+dicts_size = sum(sys.getsizeof(vector) + sum(sys.getsizeof(weight) for weight in vector.values())
+                 for vector in vectors)
+exact_time, exact_runs = run_queries(vectorial_search, index, WEIGHT_TYPE)
+exact_map = average_measures(evaluate_runs(exact_runs, expected_results))['average_precision']
+
+print("%s poids" % weights_count)
+print("précision   taille (Mo)   octets/poids   gain     temps moyen (s)   MAP      écart de MAP   top 10 identiques")
+print("dict        %-13.2f %-14.1f x1.0     %.5f           %.4f   -              -"
+      % (dicts_size / 1e6, float(dicts_size) / weights_count, exact_time, exact_map))
+for precision in PRECISIONS:
+    quantized_vectors = QuantizedVectors(index, WEIGHT_TYPE, precision)
+    search_time, runs = run_queries(quantized_search, quantized_vectors)
+    map_ = average_measures(evaluate_runs(runs, expected_results))['average_precision']
+    same_top = sum(runs[query_id][:10] == exact_runs[query_id][:10] for query_id in queries)
+    print("%-11s %-13.2f %-14.1f x%-7.1f %.5f           %.4f   %-+14.4f %s / %s"
+          % (precision, quantized_vectors.size / 1e6, float(quantized_vectors.size) / weights_count,
+             float(dicts_size) / quantized_vectors.size, search_time, map_, map_ - exact_map,
+             same_top, len(queries)))
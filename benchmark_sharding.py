@@ -0,0 +1,45 @@
+# coding=utf-8
+
+# Benchmark de la recherche répartie sur plusieurs shards (cf sharding.py)
+
+# Pour differents nombres de shards, on mesure:
+#   - temps de construction (indexation des shards en parallèle et agrégation des statistiques)
+#   - temps de recherche moyen sur les queries de reference de la collection
+#   - nombre de queries dont les résultats different de ceux d'un index unique (doit etre 0)
+
+from collection import CACMCollection
+from index import Index
+from sharding import ShardedIndex
+from vectorial_search import vectorial_search
+from evaluation_utils import time_func, get_queries, average
+
+WEIGHT_TYPE = "tf_idf"
+SHARDS = [1, 2, 4]
+
+documents = list(CACMCollection().documents)
+queries = get_queries()
+
+# Résultats de reference: index unique
+index = Index(documents)
+index.get_document_vectors(WEIGHT_TYPE)
+reference_times = []
+reference_results = {}
+for query_id, query in queries.items():
+    search_time, reference_results[query_id] = time_func(vectorial_search, query, index, WEIGHT_TYPE)
+    reference_times.append(search_time)
+
+print("shards   construction (s)   temps moyen (s)   queries différentes")
+print("unique   -                  %.5f           -" % average(reference_times))
+for shards_count in SHARDS:
+    build_time, sharded_index = time_func(ShardedIndex, documents, shards_count)
+    # Premiere recherche (non chronometrée) pour que les shards calculent leurs vecteurs
+    sharded_index.search(queries['1'], WEIGHT_TYPE)
+    times = []
+    differences = 0
+    for query_id, query in queries.items():
+        search_time, search_results = time_func(sharded_index.search, query, WEIGHT_TYPE)
+        times.append(search_time)
+        differences += search_results != reference_results[query_id]
+    sharded_index.close()
+    print("%-8s %.3f              %.5f           %s"
+          % (shards_count, build_time, average(times), differences))
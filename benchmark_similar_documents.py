@@ -0,0 +1,49 @@
+# coding=utf-8
+
+# Benchmark de la recherche de documents similaires (cf vectorial_search.similar_documents)
+
+# Pour chaque taille de signature, on compare a la recherche vectorielle du texte entier
+# du document (re-processé puis comparé a tous les documents):
+#   - temps moyen d'une recherche de documents similaires
+#   - proportion des 10 documents les plus similaires (selon le texte entier) retrouvés
+
+from collection import CACMCollection
+from index import Index
+from vectorial_search import vectorial_search, similar_documents
+from evaluation_utils import time_func, average
+
+# Ponderation donnant les meilleurs resultats (cf evaluation.py)
+WEIGHT_TYPE = "tf_idf_log_normalized"
+SIGNATURE_SIZES = [5, 10, 20, 40]
+# Nombre de documents similaires cherchés, et de documents de la collection testés
+K = 10
+DOCUMENTS_COUNT = 200
+
+collection = CACMCollection()
+index = Index(collection.documents)
+documents = list(collection.documents)[:DOCUMENTS_COUNT]
+
+# Reference: recherche vectorielle du texte du document (sans le document lui meme)
+times = []
+expected = {}
+for document in documents:
+    search_time, search_results = time_func(vectorial_search, document.text, index, WEIGHT_TYPE)
+    times.append(search_time)
+    expected[document.id] = set([result.doc_id for result in search_results
+                                 if result.doc_id != document.id][:K])
+print("%s documents, %s documents similaires cherchés par document" % (len(documents), K))
+print("méthode          temps moyen (ms)   top %s retrouvé" % K)
+print("texte entier     %-18.3f -" % (1000 * average(times)))
+
+for size in SIGNATURE_SIZES:
+    # Signatures précalculées avant de chronometrer
+    index.get_document_signatures(WEIGHT_TYPE, size)
+    times = []
+    recalls = []
+    for document in documents:
+        search_time, search_results = time_func(similar_documents, document.id, index, WEIGHT_TYPE, K, size)
+        times.append(search_time)
+        if expected[document.id]:
+            found = set(result.doc_id for result in search_results)
+            recalls.append(len(found & expected[document.id]) / float(len(expected[document.id])))
+    print("signature %-6s %-18.3f %.3f" % (size, 1000 * average(times), average(recalls)))
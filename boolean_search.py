@@ -1,5 +1,12 @@
 # coding=utf-8
-from nltk import word_tokenize
+from collections import namedtuple
+import re
+
+import dedup
+import pagination
+from pagination import PAGE_SIZE, SearchPage
+from spelling import correct_words
+from term_dictionary import WILDCARD
 
 """
 L'idée ici est de représenter la query par un arbre
@@ -44,6 +51,12 @@ class AndNode(Node):
         '''
         return self.children[0].search() & self.children[1].search()
 
+    def spans(self, doc_id):
+        '''
+        Liste des (début, fin) des occurences des enfants dans le document (index positionnel)
+        '''
+        return _merge_spans(self.children, doc_id)
+
 
 class OrNode(Node):
     """
@@ -56,6 +69,12 @@ class OrNode(Node):
         '''
         return self.children[0].search() | self.children[1].search()
 
+    def spans(self, doc_id):
+        '''
+        Liste des (début, fin) des occurences des enfants dans le document (index positionnel)
+        '''
+        return _merge_spans(self.children, doc_id)
+
 
 class NotNode(Node):
     """
@@ -92,6 +111,182 @@ class WordNode(Node):
         '''
         return set(self.index.search_word(self.word))
 
+    def spans(self, doc_id):
+        '''
+        Liste des (début, fin) des occurences du mot dans le document (index positionnel)
+        '''
+        return [(position, position) for position in self.index.get_positions(self.word, doc_id)]
+
+
+class WildcardNode(Node):
+    """
+    Noeud représentant un mot avec joker (ex: comput*). Ne possède pas d'enfant.
+
+    Le noeud doit être instancier avec un index et le motif du mot
+    """
+
+    def __init__(self, index, pattern):
+        self.index = index
+        self.pattern = pattern
+
+    def expand(self):
+        '''
+        Retourne les mots de l'index correspondant au motif (trouvés dans le dictionnaire trié de l'index).
+        Si plus de MAX_WILDCARD_EXPANSION mots correspondent, on ne garde que les plus fréquents.
+        '''
+        words = self.index.term_dictionary.match(self.pattern)
+        if len(words) > MAX_WILDCARD_EXPANSION:
+            words = sorted(words, key=lambda word: -self.index._dft(word))[:MAX_WILDCARD_EXPANSION]
+        return words
+
+    def search(self):
+        '''
+        Pour un mot avec joker, le résultat est l'union des résultats des mots correspondant au motif
+        (ie le OR de ces mots)
+        '''
+        results = set()
+        for word in self.expand():
+            results |= set(self.index.search_word(word))
+        return results
+
+    def spans(self, doc_id):
+        '''
+        Liste des (début, fin) des occurences des mots correspondant au motif dans le document
+        (index positionnel)
+        '''
+        return sorted((position, position) for word in self.expand()
+                      for position in self.index.get_positions(word, doc_id))
+
+
+class FieldNode(Node):
+    """
+    Noeud représentant un mot (éventuellement avec joker) restreint a un champ des documents
+    (ex: author:knuth). Ne possède pas d'enfant.
+
+    Le noeud doit être instancier avec un index, le nom du champ et le mot (ou motif)
+    """
+
+    def __init__(self, index, field, word):
+        self.index = index
+        self.field = field
+        self.word = word
+
+    def search(self):
+        '''
+        Pour un mot restreint a un champ, le résultat est l'ensemble des documents contenant ce mot
+        dans ce champ (seuls les postings du champ sont parcourus)
+        '''
+        words = WildcardNode(self.index, self.word).expand() if _is_wildcard(self.word) else [self.word]
+        results = set()
+        for word in words:
+            results |= set(self.index.search_word(word, self.field))
+        return results
+
+    def spans(self, doc_id):
+        '''
+        Liste des (début, fin) des occurences du mot (ou des mots correspondant au motif)
+        dans le document (index positionnel). Les positions sont celles du document entier:
+        l'index ne garde pas les positions par champ
+        '''
+        words = WildcardNode(self.index, self.word).expand() if _is_wildcard(self.word) else [self.word]
+        return sorted((position, position) for word in words
+                      for position in self.index.get_positions(word, doc_id))
+
+
+class PhraseNode(Node):
+    """
+    Noeud représentant une phrase (suite de mots consécutifs, entre guillemets dans la query).
+    Ne possède pas d'enfant.
+
+    Le noeud doit être instancier avec un index positionnel et la liste des mots de la phrase
+    """
+
+    def __init__(self, index, words):
+        self.index = index
+        self.words = list(words)
+
+    def search(self):
+        '''
+        Pour une phrase, le résultat est l'ensemble des documents contenant les mots a la suite
+        (calculé par intersection des positions dans l'index)
+        Sans index positionnel, on se contente des documents contenant tous les mots (AND)
+        '''
+        if not getattr(self.index, 'positional', False):
+            results = set(self.index.documents_ids)
+            for word in self.words:
+                results &= set(self.index.search_word(word))
+            return results
+        return self.index.search_phrase(self.words)
+
+    def spans(self, doc_id):
+        '''
+        Liste des (début, fin) des occurences de la phrase dans le document
+        '''
+        length = len(self.words)
+        return [(start, start + length - 1)
+                for start in self.index.get_phrase_positions(self.words, doc_id)]
+
+
+class NearNode(Node):
+    """
+    Noeud représentant un NEAR. Possède deux enfants, qui doivent avoir des positions (spans):
+    mots, mots avec joker, mots restreints a un champ, phrases, groupes AND / OR et autres NEAR
+    (pas de NOT).
+
+    Le noeud doit etre instancier avec la distance maximale (en mots) entre les deux enfants
+    et l'index
+    """
+
+    def __init__(self, left, right, distance, index):
+        if not all(hasattr(child, 'spans') for child in (left, right)):
+            raise ValueError("NEAR ne s'applique pas a un NOT")
+        self.children = (left, right)
+        self.distance = distance
+        self.index = index
+
+    def search(self):
+        '''
+        Pour un NEAR, le résultat est l'ensemble des documents contenant les deux enfants
+        a au plus `distance` mots d'écart
+        Sans index positionnel, on se contente des documents contenant les deux enfants (AND)
+        '''
+        left, right = self.children
+        if not getattr(self.index, 'positional', False):
+            return left.search() & right.search()
+        return set(doc_id for doc_id in left.search() & right.search()
+                   if self._are_near(left.spans(doc_id), right.spans(doc_id)))
+
+    def spans(self, doc_id):
+        '''
+        Liste des (début, fin) des occurences des enfants dans le document (index positionnel),
+        pour composer les NEAR (ex: a NEAR b NEAR c)
+        '''
+        return _merge_spans(self.children, doc_id)
+
+    def _are_near(self, left_spans, right_spans):
+        '''
+        Parcourt en parallèle les deux listes (triées) d'occurences et renvoie True
+        si une occurence de gauche est a moins de `distance` mots d'une occurence de droite
+        '''
+        i = j = 0
+        while i < len(left_spans) and j < len(right_spans):
+            (left_start, left_end), (right_start, right_end) = left_spans[i], right_spans[j]
+            if max(right_start - left_end, left_start - right_end) <= self.distance:
+                return True
+            # On avance l'occurence qui finit le plus tot
+            if left_end < right_end:
+                i += 1
+            else:
+                j += 1
+        return False
+
+
+def _merge_spans(children, doc_id):
+    '''
+    Union (triée par début) des (début, fin) des occurences des noeuds `children` dans le document
+    '''
+    return sorted(span for child in children for span in child.spans(doc_id))
+
 
 def _tokenize_query(query, index):
     '''
@@ -101,26 +296,136 @@ def _tokenize_query(query, index):
     query = query.lower().strip()
 
     # On tokenize
-    words = word_tokenize(query, 'english')
+    # Les mots restreints a un champ (ex: author:knuth) et les mots avec joker (ex: comput*)
+    # sont mis de coté avant, car la tokenisation séparerait le : et le *
+    words = []
+    for part in _split_fields(query, index):
+        if isinstance(part, FieldToken):
+            words.append(part)
+            continue
+        for i, subpart in enumerate(WILDCARD_TOKEN.split(part)):
+            if i % 2:  # mot avec joker
+                words.append(subpart)
+            else:
+                words += index._tokenize(subpart)
 
     # On utlise le preprocessing de l'index pour etre coherent avec le traitement des docs
-    # SAUF si le mot est dans ["(", ")", "and", "or", "not"] car ce sont des "mots d'actions"
+    # SAUF si le mot est dans ["(", ")", "and", "or", "not", "near"] car ce sont des "mots d'actions"
     # pour la recherche booleene qui seraient sinon retirés par le preprocessing
+    # Les mots entre guillemets (que la tokenization transforme en `` et '') forment une phrase,
+    # représentée par le tuple de ses mots processés. Un guillemet ouvre ou ferme la phrase en cours
+    # (la tokenisation par morceaux peut prendre un guillemet fermant pour un ouvrant)
+    # Les mots avec joker ne sont pas processés: ils sont comparés aux mots (processés) de l'index
+    # Les mots restreints a un champ sont processés (un par mot obtenu) sauf s'ils ont un joker
     tokens = []
+    phrase = None  # mots de la phrase en cours
     for word in words:
-        if word and _is_word(word):
+        if isinstance(word, FieldToken):
+            if _is_wildcard(word.word):
+                tokens.append(word)
+            else:
+                tokens += [FieldToken(word.field, field_word)
+                           for field_word in index._text_to_words(word.word)]
+        elif word in (PHRASE_START, PHRASE_END) and phrase is None:
+            phrase = []
+        elif word in (PHRASE_START, PHRASE_END):
+            tokens.append(tuple(phrase))
+            phrase = None
+        elif phrase is not None:
+            phrase += index._text_to_words(word)
+        elif _is_wildcard(word):
+            tokens.append(word)
+        elif word and _is_word(word):
             # Preprocessing
             tokens += index._text_to_words(word)
         else:  # le mot est un "mot d'action"
             tokens.append(word)
-    return tokens
+    # Guillemet non refermé: la phrase va jusqu'a la fin de la query
+    if phrase is not None:
+        tokens.append(tuple(phrase))
+    return _drop_dangling_near(tokens)
+
+
+def _drop_dangling_near(tokens):
+    '''
+    Retire les NEAR sans opérande d'un coté (ex: "near neighbor search"): "near" est alors
+    un mot ordinaire, qui est un stop word
+    '''
+    kept = []
+    for i, token in enumerate(tokens):
+        if _near_distance(token) is not None:
+            has_left = bool(kept) and (_is_word(kept[-1]) or kept[-1] == ")")
+            has_right = i + 1 < len(tokens) and (_is_word(tokens[i + 1]) or tokens[i + 1] == "(")
+            if not (has_left and has_right):
+                continue
+        kept.append(token)
+    return kept
+
+
+# Les guillemets ouvrants et fermants, tels que renvoyés par la tokenisation
+PHRASE_START = "``"
+PHRASE_END = "''"
+
+# Un mot (éventuellement avec joker) restreint a un champ: champ:mot
+FIELD_TOKEN = re.compile(r'(\w+):([\w*]+)', re.UNICODE)
+
+# Un mot restreint a un champ, une fois extrait de la query
+FieldToken = namedtuple("FieldToken", ['field', 'word'])
+
+# Un mot contenant au moins un joker
+WILDCARD_TOKEN = re.compile(r'([\w*]*\%s[\w*]*)' % WILDCARD, re.UNICODE)
+
+# Nombre maximum de mots auxquels un mot avec joker peut s'étendre
+MAX_WILDCARD_EXPANSION = 50
+
+# Distance maximale par défaut (en mots) pour un NEAR sans distance explicite ("near" et non "near/3")
+NEAR_DISTANCE = 5
+
+
+def _split_fields(query, index):
+    '''
+    Découpe la query en morceaux de texte et en FieldToken (mots restreints a un champ de l'index).
+    Un "champ:mot" dont le champ n'existe pas dans l'index est laissé dans le texte
+    '''
+    fields = getattr(index, 'fields', ())
+    parts = []
+    text_start = 0
+    for match in FIELD_TOKEN.finditer(query):
+        if match.group(1) in fields:
+            parts.append(query[text_start:match.start()])
+            parts.append(FieldToken(match.group(1), match.group(2)))
+            text_start = match.end()
+    parts.append(query[text_start:])
+    return parts
 
 
 def _is_word(string):
     '''
     Retourne True si le string passé en argument est un mot
     '''
-    return string not in ["(", ")", "and", "or", "not"]
+    return string not in ["(", ")", "and", "or", "not"] and _near_distance(string) is None
+
+
+def _is_wildcard(token):
+    '''
+    Retourne True si le token est un mot avec joker
+    '''
+    return not isinstance(token, tuple) and WILDCARD in token
+
+
+def _near_distance(token):
+    '''
+    Si le token est un opérateur NEAR ("near" ou "near/k"), retourne la distance associée.
+    Retourne None sinon
+    '''
+    if isinstance(token, tuple) or not token.startswith("near"):
+        return None
+    if token == "near":
+        return NEAR_DISTANCE
+    distance = token[len("near/"):]
+    if token.startswith("near/") and distance.isdigit():
+        return int(distance)
+    return None
 
 
 def _add_missing_and(tokens):
@@ -148,12 +453,15 @@ def _add_missing_and(tokens):
     return tokens_with_and
 
 
-def build_query_tree(query, index):
+def build_query_tree(query, index, correct_spelling=False):
     '''
     Construit l'arbre a partir de la query et l'index donnés
+    (en corrigeant les mots absents de l'index si `correct_spelling`, cf spelling.py)
     '''
     # On tokenise
     tokens = _tokenize_query(query, index)
+    if correct_spelling:
+        tokens = [_correct_token(token, index) for token in tokens]
 
     # On rajoute des AND si necessaire
     tokens = _add_missing_and(tokens)
@@ -168,14 +476,16 @@ def build_query_tree(query, index):
     output = []
 
     # Les opérateurs et leur priorités
-    operators = {"not": 3, "and": 2, "or": 1}
+    operators = {"near": 4, "not": 3, "and": 2, "or": 1}
+    priority = lambda token: operators["near"] if _near_distance(token) is not None else operators[token]
+    is_operator = lambda token: token in operators or _near_distance(token) is not None
     for token in tokens:
-        if token in operators:
+        if is_operator(token):
             if len(stack) == 0:
                 stack.append(token)
             else:
                 top = stack[-1]
-                while (top in operators and operators[top] > operators[token]):
+                while (is_operator(top) and priority(top) > priority(token)):
                     top = stack.pop()
                     _build_node(top, index, stack, output)
                     if len(stack) == 0:
@@ -184,14 +494,17 @@ def build_query_tree(query, index):
                 stack.append(token)
         elif token == "(":
             stack.append(token)
-            output.append("(")
         elif token == ")":
             top = stack.pop()
             while top != "(":
                 _build_node(top, index, stack, output)
                 top = stack.pop()
-            top = output.pop()
-            output.append(top)
+        elif isinstance(token, FieldToken):  # the token is a word restricted to a field
+            output.append(FieldNode(index, token.field, token.word))
+        elif isinstance(token, tuple):  # the token is a phrase
+            output.append(_phrase_node(index, token))
+        elif _is_wildcard(token):  # the token is a word with a wildcard
+            output.append(WildcardNode(index, token))
         else:  # the token is a word
             output.append(WordNode(index, token))
     while(len(stack) > 0):
@@ -201,12 +514,41 @@ def build_query_tree(query, index):
     return output[0]
 
 
+def _correct_token(token, index):
+    '''
+    Corrige les mots (processés) d'un token: mot, phrase ou mot restreint a un champ.
+    Les opérateurs et les mots avec joker sont laissés tels quels
+    '''
+    if isinstance(token, FieldToken):
+        if _is_wildcard(token.word):
+            return token
+        return FieldToken(token.field, index.spelling_corrector.correct(token.word))
+    if isinstance(token, tuple):  # phrase
+        return tuple(correct_words(token, index))
+    if not _is_word(token) or _is_wildcard(token):
+        return token
+    return index.spelling_corrector.correct(token)
+
+
+def _phrase_node(index, words):
+    """
+    Construit le noeud d'une phrase (une phrase d'un seul mot est un simple mot)
+    """
+    if len(words) == 1:
+        return WordNode(index, words[0])
+    return PhraseNode(index, words)
+
+
 def _build_node(node_type, index, stack, output):
     """
     Construit le noeud approprié et le rajoute a l'output
     """
     if node_type == "not":
         output.append(NotNode(output.pop(), index))
+    elif _near_distance(node_type) is not None:
+        right = output.pop()
+        left = output.pop()
+        output.append(NearNode(left, right, _near_distance(node_type), index))
     else:
         left = output.pop()
         right = output.pop()
@@ -217,9 +559,50 @@ def _build_node(node_type, index, stack, output):
         )
 
 
-def boolean_search(query, index):
+def boolean_search(query, index, collapse_duplicates=False, correct_spelling=False):
     """
     Effectue la recehrche binaire de la query dans l'index
+    Si `collapse_duplicates` (index construit avec duplicates=True), seul le document d'id le plus
+    petit de chaque cluster de doublons est gardé (cf dedup.py)
+    Si `correct_spelling`, les mots de la query absents de l'index sont remplacés par leur
+    correction (cf spelling.py)
+    """
+    tree = build_query_tree(query, index, correct_spelling)
+    results = tree.search()
+    if collapse_duplicates:
+        results = set(dedup.collapse_duplicates(sorted(results), index))
+    return results
+
+
+def boolean_search_page(query, index, page_size=PAGE_SIZE, after=None, collapse_duplicates=False,
+                        correct_spelling=False):
+    """
+    Page de résultats de la recherche booléenne (cf boolean_search), ordonnés par id de document:
+    les `page_size` premiers ids supérieurs a `after`, le curseur de la page précédente
+    (None pour la premiere page).
+    Renvoie une SearchPage (cf pagination.py) dont le curseur est le dernier id de la page
+    (a passer en `after` pour obtenir la page suivante), ou None pour la derniere page.
+    Les résultats ne sont jamais triés entierement (sélection des `page_size` premiers par heap).
+    """
+    doc_ids = _search_ids(query, index, collapse_duplicates, correct_spelling)
+    selected, more = pagination.page(doc_ids, page_size, after)
+    return SearchPage(selected, selected[-1] if more else None, len(doc_ids))
+
+
+def iter_boolean_search(query, index, collapse_duplicates=False, correct_spelling=False):
+    """
+    Générateur des ids des documents trouvés par la recherche booléenne (cf boolean_search),
+    par id croissant, triés au fur et a mesure qu'ils sont consommés (cf pagination.iter_sorted)
+    """
+    return pagination.iter_sorted(_search_ids(query, index, collapse_duplicates, correct_spelling))
+
+
+def _search_ids(query, index, collapse_duplicates, correct_spelling):
+    """
+    Ids (non triés) des documents trouvés par la recherche booléenne; avec `collapse_duplicates`,
+    le plus petit id de chaque cluster de doublons (comme boolean_search)
     """
-    tree = build_query_tree(query, index)
-    return tree.search()
+    doc_ids = build_query_tree(query, index, correct_spelling).search()
+    if collapse_duplicates:
+        doc_ids = dedup.collapse_unsorted(doc_ids, index, index.doc_ordinals.get)
+    return doc_ids
@@ -0,0 +1,137 @@
+# coding=utf-8
+from collections import defaultdict
+import heapq
+from math import sqrt
+import random
+
+from vectorial_search import MIN_SIMILARITY, SearchResult, _query_vector
+
+"""
+Recherche vectorielle approchée par "cluster pruning".
+
+A la construction:
+    - on tire au hasard sqrt(N) documents "leaders"
+    - chaque document est rattaché a son (ou ses) leader(s) le(s) plus proche(s)
+    - on calcule le centroide de chaque cluster
+A la recherche, on ne compare la query qu'aux centroides, puis aux documents des `probes`
+clusters les plus proches. Plus `probes` est grand, meilleur est le rappel mais plus la
+recherche est lente (probes = nombre de clusters revient a la recherche exacte).
+"""
+
+
+class ClusterPruningIndex(object):
+    '''
+    Index des clusters de documents d'un index.
+
+    Arguments:
+        - (Index) index: index de la collection
+        - (str) weight_type: type de poids des vecteurs de documents (cf Index.get_document_vector)
+        - (int) leaders_count: optionel, nombre de leaders (par défaut racine du nombre de documents)
+        - (int) leaders_per_document: optionel, nombre de clusters auxquels rattacher chaque document
+        - (int) seed: optionel, graine du tirage des leaders
+    '''
+
+    def __init__(self, index, weight_type, leaders_count=None, leaders_per_document=1, seed=0):
+        self.index = index
+        self.weight_type = weight_type
+
+        # Vecteurs unitaires des documents (indexés par ordinal):
+        # le cosinus devient un simple produit scalaire
+        self.vectors = [_unit_vector(vector) for vector in index.get_document_vectors(weight_type)]
+        # Ordinaux dans l'ordre des ids de documents, pour un tirage des leaders indépendant
+        # de l'ordre d'indexation
+        ordinals = sorted(range(len(self.vectors)), key=index.doc_ordinals.key)
+        if leaders_count is None:
+            leaders_count = int(sqrt(len(ordinals)))
+        leaders_count = max(1, min(leaders_count, len(ordinals)))
+        self.leaders = random.Random(seed).sample(ordinals, leaders_count)
+
+        # Rattachement des documents aux leaders les plus proches
+        leaders_postings = _postings([(leader, self.vectors[leader]) for leader in self.leaders])
+        self.clusters = defaultdict(list)  # {leader: [ordinal, ...]}
+        for ordinal in ordinals:
+            scores = _dot_products(self.vectors[ordinal], leaders_postings)
+            nearest = heapq.nlargest(leaders_per_document, scores.items(), key=lambda item: item[1])
+            # Un document sans mot commun avec les leaders est rattaché au premier leader
+            for leader, _ in nearest or [(self.leaders[0], 0)]:
+                self.clusters[leader].append(ordinal)
+
+        # Centroides (unitaires) des clusters
+        self.centroids = {}
+        for leader, members in self.clusters.items():
+            centroid = defaultdict(float)
+            for ordinal in members:
+                for term_id, weight in self.vectors[ordinal].items():
+                    centroid[term_id] += weight
+            self.centroids[leader] = _unit_vector(centroid)
+        self._centroids_postings = _postings(self.centroids.items())
+
+    @property
+    def clusters_count(self):
+        return len(self.clusters)
+
+    def nearest_clusters(self, query_vector, probes):
+        '''
+        Retourne les leaders des `probes` clusters dont le centroide est le plus proche de la query
+        '''
+        scores = _dot_products(query_vector, self._centroids_postings)
+        return [leader for leader, _ in heapq.nlargest(probes, scores.items(), key=lambda item: item[1])]
+
+
+def cluster_pruning_search(querystring, cluster_index, probes=3):
+    '''
+    Recherche vectorielle approchée de `querystring`: seuls les documents des `probes` clusters
+    les plus proches de la query sont comparés a la query.
+    Renvoie les résultats de similarité > MIN_SIMILARITY (ordonnés par similarité)
+    '''
+    query_vector = _unit_vector(_query_vector(querystring, cluster_index.index,
+                                              cluster_index.weight_type))
+    if not query_vector:
+        return []
+
+    search_results = []
+    seen = set()  # un document peut appartenir a plusieurs clusters
+    doc_ordinals = cluster_index.index.doc_ordinals
+    for leader in cluster_index.nearest_clusters(query_vector, probes):
+        for ordinal in cluster_index.clusters[leader]:
+            if ordinal in seen:
+                continue
+            seen.add(ordinal)
+            doc_vector = cluster_index.vectors[ordinal]
+            similarity = sum(weight * doc_vector.get(term_id, 0.)
+                             for term_id, weight in query_vector.items())
+            if similarity > MIN_SIMILARITY:
+                search_results.append(SearchResult(doc_ordinals.key(ordinal), similarity))
+
+    return sorted(search_results, key=lambda result: -result.similarity)
+
+
+def _unit_vector(vector):
+    '''
+    Retourne le vecteur divisé par sa norme (sans les poids nuls)
+    '''
+    norm = sqrt(sum(weight ** 2 for weight in vector.values()))
+    return dict((term_id, weight / norm) for term_id, weight in vector.items() if weight) if norm else {}
+
+
+def _postings(vectors):
+    '''
+    Index inversé {id mot: [(id, poids), ...]} d'une liste de couples (id, vecteur)
+    '''
+    postings = defaultdict(list)
+    for vector_id, vector in vectors:
+        for term_id, weight in vector.items():
+            postings[term_id].append((vector_id, weight))
+    return postings
+
+
+def _dot_products(vector, postings):
+    '''
+    Produits scalaires de `vector` avec tous les vecteurs de l'index inversé `postings`
+    (seuls les vecteurs ayant un mot commun avec `vector` sont renvoyés)
+    '''
+    scores = defaultdict(float)
+    for term_id, weight in vector.items():
+        for vector_id, other_weight in postings.get(term_id, ()):
+            scores[vector_id] += weight * other_weight
+    return scores
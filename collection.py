@@ -8,7 +8,7 @@ class Collection(object):
     '''
     Represente une collection de documents
     '''
-    _documents = {}  # {id: Document}
+    _documents = {}  # {id (int): Document}
 
 
 class CACMCollection(Collection):
@@ -25,9 +25,14 @@ class CACMCollection(Collection):
     MARKER_SUMMARY = '.W'
     MARKER_KEYWORDS = '.K'
     MARKER_AUTHOR = '.A'
+    MARKER_CITATIONS = '.X'
 
     # Les marqueurs à ignorer
-    IGNORED_MARKERS = ['.B', '.N', '.X', '.C']
+    IGNORED_MARKERS = ['.B', '.N', '.C']
+
+    # Type de lien du bloc .X correspondant aux citations (cf dataset/cite.info)
+    # Les types 4 (couplage bibliographique) et 6 (co-citations) s'en deduisent
+    CITATION_LINK_TYPE = '5'
 
     def __init__(self):
         raw_documents = self._separate_documents()
@@ -37,8 +42,8 @@ class CACMCollection(Collection):
         '''
         Renvoi le document avec l'id donné s'il existe (sinon None)
         '''
-        # Au cas ou doc_id soit un int et nom un string comme dans self._documents
-        doc_id = str(doc_id)
+        # Au cas ou doc_id soit un string et non un int comme dans self._documents
+        doc_id = int(doc_id)
         return self._documents.get(doc_id, None)
 
     @property
@@ -72,8 +77,9 @@ class CACMCollection(Collection):
         for _id, document in raw_documents.items():
             document = self._parse_document(document)
             document = CACMDocument(_id, document['title'], document['summary'],
-                                    document['keywords'], document['author'])
-            self._documents[_id] = document
+                                    document['keywords'], document['author'],
+                                    document['links'])
+            self._documents[document.id] = document
 
     def _parse_document(self, document):
         '''
@@ -82,7 +88,7 @@ class CACMCollection(Collection):
         ignore = False  # Pour savoir si le champ courant est a ignorer
         current_field = None  # le champ courant
         # le document qu'on va construire
-        processed_document = {'title': '', 'summary': '', 'keywords': '', 'author': ''}
+        processed_document = {'title': '', 'summary': '', 'keywords': '', 'author': '', 'links': []}
 
         for line in document:
             # Si la ligne commence par un marqueur, on set ignore et current_field selon le type de marqueur
@@ -100,6 +106,15 @@ class CACMCollection(Collection):
             elif line.startswith(self.MARKER_AUTHOR):
                 ignore = False
                 current_field = 'author'
+            elif line.startswith(self.MARKER_CITATIONS):
+                ignore = False
+                current_field = 'links'
+
+            # Les lignes du bloc .X sont de la forme "id doc lié<TAB>type<TAB>id doc"
+            elif current_field == 'links' and ignore is False:
+                fields = line.split()
+                if len(fields) == 3 and fields[1] == self.CITATION_LINK_TYPE:
+                    processed_document['links'].append(int(fields[0]))
 
             # Sinon, on remplit le champ approprié s'il ne faut pas l'ignorer
             elif ignore is False:
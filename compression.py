@@ -0,0 +1,60 @@
+# coding=utf-8
+
+"""
+Compression de listes d'entiers croissants (par exemple des positions dans un document):
+    - on ne garde que les écarts entre deux entiers successifs (delta encoding)
+    - chaque écart est codé en variable byte: 7 bits par octet, le bit de poids fort
+      indiquant le dernier octet d'un nombre
+Des petits écarts (cas le plus fréquent) ne prennent ainsi qu'un octet.
+"""
+
+
+def vb_encode(numbers):
+    '''
+    Code une liste d'entiers positifs en variable byte. Renvoie des bytes
+    '''
+    encoded = bytearray()
+    for number in numbers:
+        chunks = [number & 0x7f]
+        number >>= 7
+        while number:
+            chunks.append(number & 0x7f)
+            number >>= 7
+        chunks[0] |= 0x80  # marque le dernier octet du nombre
+        encoded.extend(reversed(chunks))
+    return bytes(encoded)
+
+
+def vb_decode(data):
+    '''
+    Décode des bytes codés par vb_encode. Renvoie la liste d'entiers
+    '''
+    numbers = []
+    number = 0
+    for byte in bytearray(data):
+        if byte & 0x80:
+            numbers.append((number << 7) | (byte & 0x7f))
+            number = 0
+        else:
+            number = (number << 7) | byte
+    return numbers
+
+
+def encode_positions(positions):
+    '''
+    Compresse une liste croissante de positions (delta encoding + variable byte)
+    '''
+    gaps = [position - previous for previous, position in zip([0] + positions[:-1], positions)]
+    return vb_encode(gaps)
+
+
+def decode_positions(data):
+    '''
+    Décompresse une liste de positions codée par encode_positions
+    '''
+    positions = []
+    position = 0
+    for gap in vb_decode(data):
+        position += gap
+        positions.append(position)
+    return positions
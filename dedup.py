@@ -0,0 +1,154 @@
+# coding=utf-8
+from array import array
+from collections import defaultdict
+import random
+import zlib
+
+"""
+Détection des documents quasi identiques (réimpressions, errata, résumés dupliqués).
+
+Chaque document est représenté par l'ensemble de ses "shingles" (suites de SHINGLE_SIZE mots
+consécutifs, après preprocessing). La similarité de Jaccard de deux ensembles est estimée par
+leurs signatures MinHash (HASHES_COUNT minimums de fonctions de hachage): la proportion de
+minimums égaux est un estimateur de la similarité.
+
+Pour ne pas comparer toutes les paires, la signature est découpée en BANDS bandes de ROWS valeurs
+(LSH): seuls les documents ayant une bande identique (meme "bucket") sont comparés. Les documents
+dont la similarité estimée dépasse THRESHOLD sont regroupés (union-find) en clusters de doublons.
+Tout est calculé a l'indexation, document par document: l'id du cluster d'un document est
+ensuite obtenu en temps quasi constant.
+"""
+
+# Nombre de mots par shingle
+SHINGLE_SIZE = 3
+# Découpage de la signature: BANDS bandes de ROWS valeurs
+BANDS = 16
+ROWS = 4
+HASHES_COUNT = BANDS * ROWS
+# Similarité (estimée) a partir de laquelle deux documents sont des doublons
+THRESHOLD = 0.8
+
+# Fonctions de hachage h(x) = (a * x + b) mod PRIME, tirées une fois pour toutes
+PRIME = 4294967291  # plus grand nombre premier < 2 ** 32 (les valeurs tiennent dans un array "L")
+_rng = random.Random(42)
+HASH_FUNCTIONS = [(_rng.randint(1, PRIME - 1), _rng.randint(0, PRIME - 1)) for _ in range(HASHES_COUNT)]
+
+
+def shingles(words, size=SHINGLE_SIZE):
+    '''
+    Retourne l'ensemble des shingles (hachés en entiers 32 bits) d'une liste de mots.
+    Un document de moins de `size` mots a un seul shingle: tous ses mots
+    '''
+    count = max(1, len(words) - size + 1)
+    return set(zlib.crc32(' '.join(words[i:i + size]).encode('utf-8')) & 0xffffffff
+               for i in range(count))
+
+
+def minhash(hashed_shingles):
+    '''
+    Retourne la signature MinHash (array de HASHES_COUNT entiers) d'un ensemble de shingles hachés
+    '''
+    return array('L', [min((a * shingle + b) % PRIME for shingle in hashed_shingles)
+                       for a, b in HASH_FUNCTIONS])
+
+
+def similarity(signature, other_signature):
+    '''
+    Similarité de Jaccard estimée a partir de deux signatures
+    '''
+    return sum(1 for value, other in zip(signature, other_signature) if value == other) / float(HASHES_COUNT)
+
+
+class NearDuplicates(object):
+    '''
+    Signatures MinHash, buckets LSH et clusters de doublons des documents d'un index (cf module).
+    Les documents sont désignés par leur ordinal dans l'index.
+    '''
+
+    def __init__(self):
+        self.signatures = {}  # {ordinal: signature}
+        self.buckets = defaultdict(list)  # {(bande, valeurs de la bande): [ordinal, ...]}
+        self._parents = {}  # union-find: {ordinal: ordinal parent}, absent si seul dans son cluster
+
+    def add(self, ordinal, words):
+        '''
+        Calcule la signature du document (liste de ses mots processés) et le rattache
+        aux clusters des documents déja ajoutés dont il est un doublon
+        '''
+        if not words:
+            return
+        signature = self.signatures[ordinal] = minhash(shingles(words))
+        candidates = set()
+        for band in range(BANDS):
+            bucket = self.buckets[(band, tuple(signature[band * ROWS:(band + 1) * ROWS]))]
+            candidates.update(bucket)
+            bucket.append(ordinal)
+        for candidate in candidates:
+            if similarity(signature, self.signatures[candidate]) >= THRESHOLD:
+                self._union(ordinal, candidate)
+
+    def cluster(self, ordinal):
+        '''
+        Retourne l'id du cluster de doublons du document (l'ordinal d'un de ses membres;
+        un document sans doublon est seul dans son cluster, d'id son propre ordinal)
+        '''
+        root = ordinal
+        while root in self._parents:
+            root = self._parents[root]
+        # Compression du chemin
+        while ordinal != root:
+            parent = self._parents[ordinal]
+            self._parents[ordinal] = root
+            ordinal = parent
+        return root
+
+    def clusters(self):
+        '''
+        Retourne les clusters d'au moins deux documents: {id du cluster: [ordinal, ...]}
+        '''
+        members = defaultdict(list)
+        for ordinal in sorted(self.signatures):
+            members[self.cluster(ordinal)].append(ordinal)
+        return dict((cluster, ordinals) for cluster, ordinals in members.items() if len(ordinals) > 1)
+
+    def _union(self, ordinal, other):
+        root, other_root = self.cluster(ordinal), self.cluster(other)
+        if root != other_root:
+            # Le plus petit ordinal reste la racine (id de cluster stable)
+            root, other_root = min(root, other_root), max(root, other_root)
+            self._parents[other_root] = root
+
+
+def collapse_duplicates(doc_ids, index):
+    '''
+    Ne garde que le premier document (dans l'ordre donné) de chaque cluster de doublons.
+    `doc_ids` est une liste d'ids de documents ou de résultats de recherche (SearchResult),
+    `index` un index construit avec `duplicates=True`. Une seule recherche de cluster par document.
+    '''
+    if getattr(index, 'duplicates', None) is None:
+        raise ValueError("Index built without near-duplicate detection")
+    seen = set()
+    collapsed = []
+    for doc_id in doc_ids:
+        ordinal = index.doc_ordinals.get(getattr(doc_id, 'doc_id', doc_id))
+        cluster = index.duplicates.cluster(ordinal)
+        if cluster not in seen:
+            seen.add(cluster)
+            collapsed.append(doc_id)
+    return collapsed
+
+
+def collapse_unsorted(keys, index, ordinal):
+    '''
+    Comme collapse_duplicates, pour des résultats non triés: ne garde que la plus petite clé de tri
+    de chaque cluster de doublons, sans trier les résultats (cf pagination.py).
+    `ordinal(clé)` donne l'ordinal du document d'une clé.
+    '''
+    if getattr(index, 'duplicates', None) is None:
+        raise ValueError("Index built without near-duplicate detection")
+    best = {}  # {cluster: plus petite clé}
+    for key in keys:
+        cluster = index.duplicates.cluster(ordinal(key))
+        if cluster not in best or key < best[cluster]:
+            best[cluster] = key
+    return list(best.values())
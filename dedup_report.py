@@ -0,0 +1,39 @@
+# coding=utf-8
+
+# Rapport des documents quasi identiques de la collection (cf dedup.py)
+
+# On indexe la collection avec la détection des doublons (signatures MinHash et buckets LSH
+# calculés document par document: temps quasi linéaire), puis on affiche:
+#   - temps d'indexation avec et sans détection des doublons
+#   - nombre de paires candidates (documents partageant un bucket, comptées par bucket)
+#     comparé au nombre total de paires
+#   - chaque cluster de doublons: ids, titres et similarité estimée avec le premier document
+
+from collection import CACMCollection
+from index import Index
+from dedup import similarity
+from evaluation_utils import time_func
+
+collection = CACMCollection()
+index_time, _ = time_func(Index, collection.documents)
+dedup_time, index = time_func(Index, collection.documents, duplicates=True)
+duplicates = index.duplicates
+clusters = duplicates.clusters()
+
+documents_count = len(duplicates.signatures)
+compared_pairs = sum(len(bucket) * (len(bucket) - 1) // 2 for bucket in duplicates.buckets.values())
+print("Temps d'indexation:                      %.3f s" % index_time)
+print("Temps d'indexation avec les doublons:    %.3f s" % dedup_time)
+print("Paires candidates (par bucket LSH):      %s (toutes les paires: %s)"
+      % (compared_pairs, documents_count * (documents_count - 1) // 2))
+print("Clusters de doublons:                    %s (%s documents)"
+      % (len(clusters), sum(len(ordinals) for ordinals in clusters.values())))
+
+for cluster in sorted(clusters, key=lambda cluster: -len(clusters[cluster])):
+    print("\n")
+    first = clusters[cluster][0]
+    for ordinal in clusters[cluster]:
+        document = collection.get_document_by_id(index.doc_ordinals.key(ordinal))
+        print("%-5s %.2f  %s" % (document.id,
+                                 similarity(duplicates.signatures[first], duplicates.signatures[ordinal]),
+                                 ' '.join(document.title.split())))
@@ -5,6 +5,9 @@ class Document(object):
     '''
     Represente un document.
     Un document doit avoir deux propriétés: text et id
+    Il peut aussi avoir une propriété fields (liste de couples (nom du champ, texte)):
+    ses champs sont alors indexés séparément (cf Index)
+    ou une propriété words (liste de mots déja processés): ils sont alors indexés tels quels
     '''
     @property
     def id(self):
@@ -19,12 +22,20 @@ class CACMDocument(Document):
     '''
     Represente un document de la collection CACM
     '''
-    def __init__(self, doc_id, title, summary, keywords, author):
-        self.doc_id = doc_id
+
+    # Champs du document, indexés séparément (cf Index)
+    FIELDS = ['title', 'summary', 'keywords', 'author']
+
+    def __init__(self, doc_id, title, summary, keywords, author, links=None):
+        # L'id est converti une seule fois en entier
+        self.doc_id = int(doc_id)
         self.title = title
         self.summary = summary
         self.keywords = keywords
         self.author = author
+        # ids des documents liés par une citation (dans un sens ou dans l'autre)
+        self.links = links or []
+        self._text = None
 
     # Pour avoir un joli "print" du document
     def __str__(self):
@@ -32,11 +43,21 @@ class CACMDocument(Document):
 
     @property
     def id(self):
-        return int(self.doc_id)
+        return self.doc_id
 
     @property
     def text(self):
-        return ' '.join([self.title, self.summary, self.keywords, self.author])
+        # Concaténation des champs, calculée une seule fois
+        if self._text is None:
+            self._text = ' '.join([self.title, self.summary, self.keywords, self.author])
+        return self._text
+
+    @property
+    def fields(self):
+        '''
+        Liste des couples (nom du champ, texte du champ)
+        '''
+        return [(field, getattr(self, field)) for field in self.FIELDS]
 
 
 class QueryDocument(Document):
@@ -44,8 +65,10 @@ class QueryDocument(Document):
     Represente une recherche
     '''
 
-    def __init__(self, query):
+    def __init__(self, query, words=None):
         self.query = query
+        # Mots déja processés (et corrigés, cf spelling), a indexer a la place du texte
+        self.words = words
 
     @property
     def text(self):
@@ -17,14 +17,12 @@
 # (temps d'indexation, temps de recherche, precision, rappel)
 
 import sys
-from collections import defaultdict
 
 from collection import CACMCollection
 from index import Index
 from vectorial_search import vectorial_search
 from boolean_search import boolean_search
-from evaluation_utils import time_func, get_queries, get_expected_results, average_precision
-from evaluation_utils import E_measure, F_measure, average, precision, rappel, R_precision
+from evaluation_utils import time_func, get_queries, get_expected_results, evaluate_ranking, average
 
 ##############
 # INDEXATION #
@@ -40,36 +38,29 @@ index_size = sys.getsizeof(index) / float(10**6)
 ##################################
 # METHODE POUR EVALUER UNE QUERY #
 ###################################
-def evaluate_search(query, expected_results):
+def evaluate_search(query, relevant):
     '''
     Evalue la performance de la recherche donnée pour les differents modeles
     Calcule temps de recherche, precision, R precision, rappel, F et E measure
+    (`relevant` est le set des documents pertinents pour la query)
     '''
 
     # Ce qu'on va renvoyer
     # dict {'modele': {'time': x, 'precision': x, 'rappel': x}}
-    evaluation = defaultdict(dict)
+    evaluation = {}
 
     # modele booleen
+    # (la R precision et la precision moyenne n'ont pas de sens car resultats non ordonées)
     bool_time, search_results = time_func(boolean_search, query, index)
+    evaluation['bool'] = evaluate_ranking(search_results, relevant)
     evaluation['bool']['time'] = bool_time
-    evaluation['bool']['precision'] = precision(search_results, expected_results)
-    evaluation['bool']['rappel'] = rappel(search_results, expected_results)
-    # pas de R precision car resultats non ordonées
-    evaluation['bool']['F_measure'] = F_measure(search_results, expected_results)
-    evaluation['bool']['E_measure'] = E_measure(search_results, expected_results)
 
     # modele vectoriel (evalué avec poids tf idf log normalisee
     # (d'apres mes tests, c'est la ponderation qui donne les meilleurs resultats)
     vect_time, search_results = time_func(vectorial_search, query, index, "tf_idf_log_normalized")
     search_results = [result.doc_id for result in search_results]
-    evaluation['vect']['time'] = bool_time
-    evaluation['vect']['precision'] = precision(search_results, expected_results)
-    evaluation['vect']['rappel'] = rappel(search_results, expected_results)
-    evaluation['vect']['R_precision'] = R_precision(search_results, expected_results)
-    evaluation['vect']['F_measure'] = F_measure(search_results, expected_results)
-    evaluation['vect']['E_measure'] = E_measure(search_results, expected_results)
-    evaluation['vect']['average_precision'] = average_precision(search_results, expected_results)
+    evaluation['vect'] = evaluate_ranking(search_results, relevant)
+    evaluation['vect']['time'] = vect_time
 
     return evaluation
 
@@ -83,8 +74,8 @@ evaluations = {}
 
 # On evalue les perfs de la query donnée
 for idx, query in queries.iteritems():
-    expected_results = results[idx]
-    evaluations[idx] = evaluate_search(query, expected_results)
+    relevant = set(results[idx])
+    evaluations[idx] = evaluate_search(query, relevant)
 
 
 ##################################
@@ -126,6 +117,7 @@ average_F_measure = average([result['F_measure'] for result in vectorial_results
 average_E_measure = average([result['E_measure'] for result in vectorial_results])
 # Le MAP est la moyenne des averages precision
 map_ = average([result['average_precision'] for result in vectorial_results])
+average_nDCG = average([result['nDCG'] for result in vectorial_results])
 
 # Affichage resultats
 print("Temps de recherche moyen:       %s s" % average_time)
@@ -135,3 +127,4 @@ print("R precision moyenne:            %s" % average_R_precision)
 print("F mesure moyenne:               %s" % average_F_measure)
 print("E mesure moyenne:               %s" % average_E_measure)
 print("MAP (Mean average precision):   %s" % map_)
+print("nDCG moyen:                     %s" % average_nDCG)
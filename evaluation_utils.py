@@ -1,5 +1,6 @@
 # coding=utf-8
 from collections import defaultdict
+from math import log
 import time
 
 
@@ -58,97 +59,94 @@ def get_expected_results():
     return results
 
 
-def precision(results, expected_results, ordre=None):
+def evaluate_ranking(results, relevant, ranks=(5, 10, 20), B=1):
     '''
-    Mesure de precision = P(pertinents|retrouvées)
+    Calcule toutes les mesures d'une recherche en un seul parcours de ses résultats.
 
-    Si un ordre est donnée, calcul la precision a cette ordre
-    '''
-    if ordre:
-        # Si on calcule la precision a l'ordre k
-        # on ne garde que les k premiers resultats
-        results = results[:ordre]
-        expected_results = expected_results[:ordre]
-
-    # Utilisations de set pour pouvoir facilement faire des intersections entre les 2 ensembles
-    results = set(results)
-    expected_results = set(expected_results)
-    pertinents = results & expected_results
-    if not results:
-        # Si on a pas de resultats:
-        # - la precision vaut 1 si on attend en effet 0 resultats
-        # - 0 sinon
-        return 0 if expected_results else 1
-    return len(pertinents) / float(len(results))  # float force une division non entiere
-
-
-def rappel(results, expected_results, ordre=None):
-    '''
-    Mesure de rappel = P(retrouvées|pertinents)
-    '''
-    if ordre:
-        # Si on calcule le rappel a l'ordre k
-        # on ne garde que les k premiers resultats
-        results = results[:ordre]
-        expected_results = expected_results[:ordre]
-
-    # Utilisations de set pour pouvoir facilement faire des intersections entre les 2 ensembles
-    results = set(results)
-    expected_results = set(expected_results)
-    pertinents = results & expected_results
-    if not expected_results:
-        # Si on attend 0 resultats, le rappel vaut 1
-        return 1
-    return len(pertinents) / float(len(expected_results))  # float force une division non entiere
-
-
-def R_precision(results, expected_results):
-    '''
-    Precision au rang R, ou R est le nb de documents pertinents.
+    Arguments:
+        - results: résultats de la recherche (ids des documents, ordonnés par pertinence)
+        - relevant: set des ids des documents pertinents (a précalculer une fois par query)
+        - ranks: rangs k auxquels calculer la precision@k
+        - B: rapport precision / rappel voulu pour les mesures F et E
 
-    Pour que cette mesure est du sens, il faut que results soit ordonée par pertinence
-    (ie: ca ne sert a rien pour notre modele booleen non ordonée)
+    Renvoie un dict avec les clés: precision, rappel, R_precision, F_measure, E_measure,
+    average_precision, nDCG et precision@k pour chaque k de ranks.
+    Cas limites: sans résultat, la precision vaut 1 si aucun document n'est pertinent (0 sinon);
+    sans document pertinent, le rappel, la R precision, la precision moyenne et le nDCG valent 1.
     '''
-    return precision(results[:len(expected_results)], expected_results)
+    R = len(relevant)
+    measures = {}
+    hits = 0              # nombre de documents pertinents vus
+    sum_precisions = 0.   # somme des precisions aux rangs des documents pertinents
+    dcg = 0.
+    rank = 0
+    for rank, doc_id in enumerate(results, 1):
+        if doc_id in relevant:
+            hits += 1
+            sum_precisions += hits / float(rank)
+            dcg += 1 / log(rank + 1, 2)
+        if rank in ranks:
+            measures['precision@%s' % rank] = hits / float(rank)
+        if rank == R:
+            measures['R_precision'] = hits / float(R)
+    n = rank  # nombre de résultats
 
+    # Moins de résultats que certains rangs demandés
+    for k in ranks:
+        measures.setdefault('precision@%s' % k, hits / float(k))
+    if 'R_precision' not in measures:
+        # Moins de résultats que de documents pertinents: precision sur les n résultats
+        if not R:
+            measures['R_precision'] = 1
+        else:
+            measures['R_precision'] = hits / float(n) if n else 0
 
-def E_measure(results, expected_results, B=1):
-    '''
-    Mesure E = 1 - (B^2 + 1)PR / (B^2 P + R)
-    avec:
-        - B = rapport precision / rappel voulu
-        - P = precision
-        - R = rappel
-
-    J'utlise B (beta dans le cours) = 1 par default
-    car le cours indique que c'est la valeur la plus populaire
-    '''
-    P = precision(results, expected_results)
-    R = rappel(results, expected_results)
-    if (B**2 * P + R == 0):
-        return 1
-    return 1 - ((B**2 + 1) * P * R) / (B**2 * P + R)
+    P = hits / float(n) if n else (0 if R else 1)
+    rappel_ = hits / float(R) if R else 1
+    measures['precision'] = P
+    measures['rappel'] = rappel_
+    if B**2 * P + rappel_ == 0:
+        measures['E_measure'] = 1
+    else:
+        measures['E_measure'] = 1 - ((B**2 + 1) * P * rappel_) / (B**2 * P + rappel_)
+    measures['F_measure'] = 1 - measures['E_measure']
+
+    # Precision moyenne: moyenne des precisions aux rangs des documents pertinents
+    # (un document pertinent non retrouvé compte pour une precision de 0)
+    measures['average_precision'] = sum_precisions / R if R else 1
+
+    # nDCG (pertinence binaire): DCG divisé par le DCG d'un classement idéal
+    ideal_dcg = sum(1 / log(i + 1, 2) for i in range(1, R + 1))
+    measures['nDCG'] = dcg / ideal_dcg if R else 1
 
+    return measures
 
-def F_measure(results, expected_results, B=1):
+
+def evaluate_runs(runs, expected_results, ranks=(5, 10, 20), B=1):
     '''
-    Mesure F = 1 - E
+    Evalue d'un coup les résultats de toutes les queries.
+
+    Arguments:
+        - runs: dict {query_id: résultats (ids des documents ordonnés par pertinence)}
+        - expected_results: dict {query_id: [documents pertinents]} (cf get_expected_results)
 
-    A nouveau, utilisation de B = 1 par default car valeur la plus populaire
+    Renvoie un dict {query_id: mesures (cf evaluate_ranking)}
     '''
-    return 1 - E_measure(results, expected_results, B)
+    relevant_sets = dict((query_id, set(expected)) for query_id, expected in expected_results.items())
+    return dict((query_id, evaluate_ranking(results, relevant_sets.get(query_id, set()), ranks, B))
+                for query_id, results in runs.items())
 
 
-def average_precision(results, expected_results):
+def average_measures(evaluations):
     '''
-    La precision moyenne pour une recherche est
-    la moyenne des pertinences aux differents ordres
+    Moyenne de chaque mesure sur toutes les queries
+    (evaluations est le dict renvoyé par evaluate_runs)
     '''
-    if expected_results:
-        return average([precision(results, expected_results, i + 1)
-                        for i in range(len(expected_results))])
-    else:  # pas de resultat attendu, la precision moyenne est 1
-        return 1
+    evaluations = list(evaluations.values())
+    if not evaluations:
+        return {}
+    return dict((measure, average([evaluation[measure] for evaluation in evaluations]))
+                for measure in evaluations[0])
 
 
 def average(data):
@@ -159,14 +157,15 @@ def average(data):
     return float(sum(data)) / len(data)
 
 
-def time_func(func, *args):
+def time_func(func, *args, **kwargs):
     '''
     Mesure le temps pris par le calcul de func avec les arguments données
+    (positionnels et nommés)
 
     Renvoie un couple time, resultats
     '''
     start = time.time()
-    results = func(*args)
+    results = func(*args, **kwargs)
     end = time.time()
 
     return (end - start, results)
@@ -1,13 +1,16 @@
 # coding=utf-8
-import inspect
+from array import array
 import sys
 from collections import defaultdict
-import string
-from math import log10, sqrt
+import heapq
+from math import ceil, log10, sqrt
 
-from nltk import word_tokenize
-from nltk.stem.snowball import SnowballStemmer
-from nltk.corpus import stopwords
+from analyzer import get_analyzer, token_spans
+from compression import decode_positions, encode_positions
+from dedup import NearDuplicates
+from spelling import SpellingCorrector
+from term_dictionary import TermDictionary
+from vocabulary import Vocabulary
 
 
 class Index(object):
@@ -16,6 +19,20 @@ class Index(object):
 
     Arguments:
         - (list) documents: optionel, liste de documents intiaux a ajouter a l'index
+        - (bool) positional: optionel, garde aussi les positions des mots dans les documents
+          (nécessaire pour les recherches de phrases et de proximité)
+        - (str) analyzer: optionel, analyseur utilisé pour processer les textes (cf analyzer.py):
+          "nltk" (par défaut) ou "builtin" (pur python, sans import de NLTK)
+        - (bool) duplicates: optionel, détecte aussi les documents quasi identiques a l'indexation
+          (signatures MinHash et clusters de doublons, cf dedup.py), gardés dans self.duplicates
+
+    Les mots et les documents sont représentés en interne par des entiers denses
+    (ids de mots et ordinaux de documents, cf vocabulary.py):
+        - les méthodes prenant des mots ou des ids de documents (get_document_vector, search_word,
+          search_phrase, get_positions, ...) les traduisent et renvoient des ids de documents
+        - les structures utilisées par les algorithmes de recherche (indexs, get_document_vectors,
+          get_document_norms, get_impact_postings, get_tiered_postings, proximity_window,
+          token_offsets) sont indexées par ids de mots et ordinaux
 
     Méthodes utiles:
         - add_documents(self, documents)
@@ -23,80 +40,203 @@ class Index(object):
         - add_document(self, document)
             ->ajoute un document a l'index
         - get_document_vector(self, document_id, weight_type, index)
-            -> retourne vecteur de poids ({mot1: poids1, mot2: poids2, ...}) pour le document id demandé.
+            -> retourne vecteur de poids ({id mot1: poids1, id mot2: poids2, ...}) pour le document id demandé.
                `weight_type` indique le type de poids a utiliser
                     ("tf_idf", "tf_idf_normalized", "tf_idf_log", "tf_idf_log_normalized")
                 `index`, optionel indique l'index a utiliser pour caculer la dft des mots
                     (Utile pour indexer une query par rapport a une collection)
+        - term_dictionary
+            -> dictionnaire trié des mots de l'index (recherches par préfixe et par joker)
+        - spelling_corrector
+            -> index de k-grams des mots de l'index (correction orthographique des queries)
+        - get_positions(self, word, doc_id)
+            -> retourne la liste des positions du mot dans le document (index positionnel uniquement)
+        - search_phrase(self, words)
+            -> retourne les ids des documents contenant la suite de mots `words` (index positionnel uniquement)
+        - get_impact_postings(self, weight_type)
+            -> retourne les postings de chaque mot triés par impact décroissant
+               (utilisé par la recherche "anytime" de vectorial_search.impact_search)
+        - get_field_vectors(self, field, weight_type) / get_field_norms(self, field, weight_type)
+            -> vecteurs de poids et normes des champs (titre, résumé, ...) des documents
+               (utilisés par la recherche pondérée par champ vectorial_search.field_search)
+        - get_tiered_postings(self, weight_type)
+            -> retourne pour chaque mot sa "champion list" (tier 1) et le reste de ses postings (tier 2)
+               (utilisé par vectorial_search.tiered_search)
+        - get_document_signatures(self, weight_type)
+            -> retourne pour chaque document ses mots de poids le plus fort
+               (utilisé par la recherche de documents similaires vectorial_search.similar_documents)
     '''
 
     # les "stop words" (mots communs a ne pas considérer dans les indexs)
     STOP_WORDS_PATH = './dataset/common_words'
     stop_words = []
 
-    def __init__(self, documents=[]):
+    # Nombre de niveaux utilisés pour quantifier les impacts des postings
+    IMPACT_LEVELS = 64
+
+    # Taille des "champion lists" (nombre de documents de poids le plus fort gardés par mot)
+    CHAMPIONS_COUNT = 50
+
+    # Taille des signatures des documents (nombre de mots de poids le plus fort gardés par document)
+    SIGNATURE_SIZE = 10
+
+    def __init__(self, documents=[], positional=False, analyzer='nltk', duplicates=False):
+        self.positional = positional
+        self.analyzer = analyzer
+        # Clusters de documents quasi identiques (None si la détection n'est pas demandée)
+        self.duplicates = NearDuplicates() if duplicates else None
         self._build_stop_words()
+        self._analyzer = get_analyzer(analyzer, self.stop_words)
         self._initialize_indexs()
         self.add_documents(documents)
 
     def __sizeof__(self):
         '''
         Retourne la taille en octet de l'objet
+        (attributs de l'instance uniquement: les properties, comme term_dictionary ou
+        spelling_corrector, ne sont pas évaluées, ce qui construirait les structures paresseuses)
         '''
         size = 0
-        for (name, val) in inspect.getmembers(self):
+        for (name, val) in vars(self).items():
             size += sys.getsizeof(val)
             size += sys.getsizeof(name)
         return size
 
     def _initialize_indexs(self):
         '''
-        Initialize les indexs doc -> mots et mots -> docs avec des valeurs par default
+        Initialize les vocabulaires et les indexs doc -> mots et mots -> docs
 
-        L'utilisation de defaultdict permet de "forcer" la structure des dictionnaires d'index
-        Ce qui permettra d'eviter de devoir a chaque fois checker si les clés / valeurs existent
-        Comme ca on aura toujours index[doc][mot] = 0 si la valeur n'a pas été set au lieu d'une KeyError
+        Les ids de mots et les ordinaux de documents étant denses, les indexs sont des listes
+        indexées par ces entiers. Les postings sont des defaultdict, pour avoir
+        index[ordinal][id mot] = 0 si la valeur n'a pas été set au lieu d'une KeyError
         '''
+        # Vocabulaires mot <-> id de mot et id de document <-> ordinal
+        self.vocabulary = Vocabulary()
+        self.doc_ordinals = Vocabulary()
+
         # Index document -> mots
-        # dictionnaire de la forme:
-        # {
-        #     'id doc': {
-        #         'mot 1': occurence (int)
-        #         'mot 2': occurence (int)
+        # liste indexée par ordinal de document, de la forme:
+        # [
+        #     {                              # document d'ordinal 0
+        #         id mot 1: occurence (int)
+        #         id mot 2: occurence (int)
         #     },
-        #     'id doc 2: {...}
-        # }
-        self.document_index = defaultdict(lambda: defaultdict(int))
+        #     {...},                         # document d'ordinal 1
+        # ]
+        self.document_index = []
 
         # Index mots -> document
-        # dictionnaire de la forme:
-        # {
-        #     'mot 1': {
-        #         'id doc': occurence (int)
-        #         'id doc': occurence (int)
+        # liste indexée par id de mot, de la forme:
+        # [
+        #     {                              # mot d'id 0
+        #         ordinal doc: occurence (int)
+        #         ordinal doc: occurence (int)
         #     },
-        #     'id doc 2: {...}
+        #     {...},                         # mot d'id 1
+        # ]
+        self.word_index = []
+
+        # Index positionnel (si self.positional) mots -> document -> positions
+        # liste indexée par id de mot, de la forme:
+        # [
+        #     {
+        #         ordinal doc: positions compressées (cf compression.encode_positions)
+        #     },
+        #     ...
+        # ]
+        # Les positions sont celles des mots après preprocessing (stop words retirés)
+        self.positional_index = []
+
+        # Indexs par champ (pour les documents ayant des champs, cf documents.Document)
+        # Noms des champs, dans l'ordre ou ils ont été rencontrés
+        self.fields = []
+        # Index mots -> document de chaque champ, de la forme:
+        # {
+        #     'champ': {
+        #         id mot: {ordinal doc: occurence (int)}
+        #     }
         # }
-        self.word_index = defaultdict(lambda: defaultdict(int))
+        self.field_index = {}
+        # Index document -> mots de chaque champ, de la forme:
+        # {
+        #     'champ': [{id mot: occurence (int)}, ...]   # liste indexée par ordinal
+        # }
+        self.field_document_index = {}
+
+        # Position dans le texte des mots des documents (pour les extraits, cf snippets.py)
+        # liste indexée par ordinal de document d'arrays de la forme:
+        # [début mot 1, fin mot 1, id mot 1, début mot 2, fin mot 2, id mot 2, ...]
+        # (un triplet par mot après preprocessing, dans l'ordre du texte; positions en caractères
+        #  dans `document.text`)
+        self.token_offsets = []
+
+        self._clear_caches()
+
+    def _clear_caches(self):
+        '''
+        Vide les structures précalculées a partir des indexs
+        (a appeler des que le contenu de l'index change)
+        '''
+        # {weight_type: [vecteur de chaque ordinal]}
+        self._vectors_cache = {}
+        # {weight_type: array(norme du vecteur de chaque ordinal)}
+        self._norms_cache = {}
+        # {(champ, weight_type): [vecteur du champ de chaque ordinal]}
+        self._field_vectors_cache = {}
+        # {(champ, weight_type): array(norme du vecteur du champ de chaque ordinal)}
+        self._field_norms_cache = {}
+        # {weight_type: {id mot: [(impact, [ordinal, ...]), ...]}}
+        self._impact_postings = {}
+        # {(weight_type, taille des champion lists): {id mot: ([ordinal tier 1], [ordinal tier 2])}}
+        self._tiered_postings = {}
+        # {(weight_type, taille des signatures): [signature de chaque ordinal]}
+        self._signatures_cache = {}
+        # Dictionnaire trié des mots (cf term_dictionary)
+        self._term_dictionary = None
+        # Index de k-grams des mots (cf spelling)
+        self._spelling_corrector = None
 
     @property
     def documents_count(self):
         '''
         Nombre de documents indexés
         '''
-        return len(self.document_index.keys())
+        return len(self.doc_ordinals)
 
     @property
     def documents_ids(self):
         '''
-        Liste des ids des documents indexés
+        Liste des ids des documents indexés (dans l'ordre de leurs ordinaux). C'est une copie:
+        la modifier ne change pas l'index
         '''
-        return self.document_index.keys()
+        return list(self.doc_ordinals.keys)
+
+    @property
+    def term_dictionary(self):
+        '''
+        Dictionnaire trié des mots de l'index (construit a la premiere utilisation)
+        '''
+        if self._term_dictionary is None:
+            self._term_dictionary = TermDictionary(self.vocabulary.keys)
+        return self._term_dictionary
+
+    @property
+    def spelling_corrector(self):
+        '''
+        Index de k-grams des mots de l'index, pour corriger les mots des queries
+        (construit a la premiere utilisation)
+        '''
+        if self._spelling_corrector is None:
+            self._spelling_corrector = SpellingCorrector(self.vocabulary.keys, self._dft)
+        return self._spelling_corrector
 
     def _build_stop_words(self):
         '''
         Remplit self.stop_words a partir des common_words du dataset
+        (une seule fois: la liste est partagée par tous les index)
         '''
+        if self.stop_words:
+            return
         with open(self.STOP_WORDS_PATH, 'r') as common_words:
             for word in common_words:
                 self.stop_words.append(word.strip().lower())
@@ -109,14 +249,91 @@ class Index(object):
         '''
         Ajoute un document a l'index.
         document devrait etre une sous classe de documents.Document (pour les attributs `id` et `text`)
+
+        Les mots du document sont ceux de _document_words.
         '''
-        words = self._text_to_words(document.text)
+        offsets = []  # (début, fin) de chaque mot dans le texte
+        words, fields_words = self._document_words(document, offsets)
+        ordinal = self.doc_ordinals.add(document.id)
+        if ordinal == len(self.document_index):
+            self.document_index.append(defaultdict(int))
+            self.token_offsets.append(None)
+        document_words = self.document_index[ordinal]
+        document_offsets = self.token_offsets[ordinal] = array('I')
+
         # On remplit nos indexs avec les mots du documents
+        positions = defaultdict(list)
+        for position, word in enumerate(words):
+            term_id = self.vocabulary.add(word)
+            if term_id == len(self.word_index):  # nouveau mot
+                self.word_index.append(defaultdict(int))
+                if self.positional:
+                    self.positional_index.append({})
+            document_words[term_id] += 1
+            self.word_index[term_id][ordinal] += 1
+            positions[term_id].append(position)
+            if offsets:
+                document_offsets.extend((offsets[position][0], offsets[position][1], term_id))
+
+        if self.positional:
+            for term_id, word_positions in positions.items():
+                self.positional_index[term_id][ordinal] = encode_positions(word_positions)
+
+        for field, field_words in fields_words:
+            self._add_field(field, ordinal, field_words)
+        if self.duplicates is not None:
+            self.duplicates.add(ordinal, words)
+        self._clear_caches()
+
+    def _document_words(self, document, offsets=None):
+        '''
+        Processe un document et retourne le couple (mots du document, [(champ, mots du champ)]).
+        Si le document a des champs, chaque champ est processé séparément et les mots du document
+        sont ceux de ses champs mis bout a bout.
+        Si le document a des mots déja processés (propriété `words`), ils sont renvoyés tels quels
+        (sans position dans le texte).
+        Si une liste `offsets` est passée, on y ajoute la position (début, fin) de chaque mot
+        dans `document.text` (cf _text_to_words)
+        '''
+        if getattr(document, 'words', None) is not None:
+            return document.words, []
+        fields = getattr(document, 'fields', None)
+        if not fields:
+            return self._text_to_words(document.text, offsets), []
+        # Le texte du document est celui de ses champs séparés par un espace
+        fields_words = []
+        field_start = 0
+        for field, text in fields:
+            field_offsets = [] if offsets is not None else None
+            fields_words.append((field, self._text_to_words(text, field_offsets)))
+            if offsets is not None:
+                offsets += [(start + field_start, end + field_start) for start, end in field_offsets]
+            field_start += len(text) + 1
+        return [word for _, field_words in fields_words for word in field_words], fields_words
+
+    def _add_field(self, field, ordinal, words):
+        '''
+        Ajoute les mots (déja dans le vocabulaire) du champ `field` du document d'ordinal donné
+        aux indexs du champ
+        '''
+        if field not in self.field_index:
+            self.fields.append(field)
+            self.field_index[field] = {}
+            self.field_document_index[field] = []
+        field_postings = self.field_index[field]
+        field_documents = self.field_document_index[field]
+        # Les documents sans ce champ ont un champ vide
+        while len(field_documents) <= ordinal:
+            field_documents.append(defaultdict(int))
+
         for word in words:
-            self.document_index[document.id][word] += 1
-            self.word_index[word][document.id] += 1
+            term_id = self.vocabulary.get(word)
+            field_documents[ordinal][term_id] += 1
+            if term_id not in field_postings:
+                field_postings[term_id] = defaultdict(int)
+            field_postings[term_id][ordinal] += 1
 
-    def _text_to_words(self, text):
+    def _text_to_words(self, text, offsets=None):
         '''
         Processe un texte et retourne une liste de mots
         Le processing effectue les actions suivantes:
@@ -124,87 +341,112 @@ class Index(object):
             - tokenisation
             - retrait des stop_words
             - stemming des mots
+        Si une liste `offsets` est passée, on y ajoute la position (début, fin) dans `text`
+        de chaque mot renvoyé
         '''
         # On met le texte en minuscule
-        text = text.lower().strip()
+        text = text.lower()
+        stripped = len(text) - len(text.lstrip())
+        text = text.strip()
 
         # Tokenisation
-        tokens = word_tokenize(text, language="english")
+        tokens = self._tokenize(text)
+        if offsets is not None:
+            spans = token_spans(text, tokens)
 
         # On retire les mots commencant par une apostrophe
         # (la tokenization transforme I'd like en ["I", "'d", "like"]
         #  et on pourrait se passer de "'d")
-        tokens = [token for token in tokens if not token.startswith("'")]
-
         # stop_words
         # On retire les stop words de notre vecteur.
         # En plus des stopwords donnees avec la collection, je rajoute les mots courants
         # Anglais donnés par NLTK et la ponctuation (sauf parantheses car utile pour query bool)
-        stop_words = self.stop_words + list(string.punctuation) + stopwords.words("english")
-        tokens = [token for token in tokens if token not in stop_words]
+        # (ensemble calculé une seule fois par l'analyseur)
+        stop_words = self._analyzer.stop_words
+        kept = [i for i, token in enumerate(tokens)
+                if not token.startswith("'") and token not in stop_words]
+        if offsets is not None:
+            offsets.extend((spans[i][0] + stripped, spans[i][1] + stripped) for i in kept)
 
-        # Stemming
-        stemmer = SnowballStemmer(language="english")
-        tokens = [stemmer.stem(word) for word in tokens]
+        # Stemming (les racines sont gardées en cache par l'analyseur)
+        return [self._analyzer.stem(tokens[i]) for i in kept]
 
-        return tokens
+    def _tokenize(self, text):
+        '''
+        Tokenise un texte (sans autre processing) avec l'analyseur de l'index
+        '''
+        return self._analyzer.tokenize(text)
 
     def _dft(self, word):
         '''
         Retourne frequence du mot dans l'index (nombre de docs avec ce mot)
         '''
-        return len(self.word_index[word].keys())
+        term_id = self.vocabulary.get(word)
+        return len(self.word_index[term_id]) if term_id is not None else 0
+
+    def _reference_dft(self, term_id, index):
+        '''
+        Retourne la frequence du mot d'id `term_id` dans l'index de reference `index`
+        (directement par id si c'est cet index, sinon via le mot)
+        '''
+        if index is self:
+            return len(self.word_index[term_id])
+        return index._dft(self.vocabulary.key(term_id))
 
-    def _tf_idf(self, doc_id, normalize, index):
+    def _tf_idf(self, counts, normalize, index):
         '''
-        Retourne vecteur avec poids tf-idf pour le document id passé en arguments.
+        Retourne vecteur avec poids tf-idf pour les occurences de mots ({id mot: occurence})
+        passées en arguments (celles d'un document ou d'un champ de document).
         Poids normalisés si arg `normalize` == True
         '''
-        tf_idf = defaultdict(float)
+        tf_idf = {}
         documents_count = index.documents_count
-        for word, count in self.document_index[doc_id].items():
+        for term_id, count in counts.items():
             # Float pour forcer une division "non entiere" dans le log de l'idf
-            dft = index._dft(word)
+            dft = self._reference_dft(term_id, index)
             # "if dft else 0" pour éviter une division par 0.
             # Si dft est nul (mot pas dans l'index de reference), on met le poids à 0
-            tf_idf[word] = count * log10(documents_count / dft) if dft else 0
+            tf_idf[term_id] = count * log10(documents_count / dft) if dft else 0
 
         # Normalisation si demandé
         if normalize:
             # On normalize en divisant par la norme du vecteur
+            # (sauf vecteur nul: aucun mot du document dans l'index de reference)
             norm = sqrt(sum(x**2 for x in tf_idf.values()))
-            for word, weight in tf_idf.items():
-                tf_idf[word] = weight / norm
+            for term_id, weight in tf_idf.items():
+                tf_idf[term_id] = weight / norm if norm else 0
 
         return tf_idf
 
-    def _tf_idf_log(self, doc_id, normalize, index):
+    def _tf_idf_log(self, counts, normalize, index):
         '''
-        Retourne vecteur avec poids tf-idf logarithmique pour le document id passé en arguments.
+        Retourne vecteur avec poids tf-idf logarithmique pour les occurences de mots ({id mot: occurence})
+        passées en arguments (celles d'un document ou d'un champ de document).
         Poids normalisés si arg `normalize` == True
         '''
-        tf_idf_log = defaultdict(float)
+        tf_idf_log = {}
         documents_count = index.documents_count
-        for word, count in self.document_index[doc_id].items():
+        for term_id, count in counts.items():
             # Float pour forcer une division "non entiere" dans le log de l'idf
-            dft = float(index._dft(word))
+            dft = float(self._reference_dft(term_id, index))
             # "if dft else 0" pour éviter une division par 0.
             # Si dft est nul (mot pas dans l'index de reference), on met le poids à 0
-            tf_idf_log[word] = (1 + log10(count)) * log10(documents_count / dft) if dft else 0
+            tf_idf_log[term_id] = (1 + log10(count)) * log10(documents_count / dft) if dft else 0
 
         # Normalisation si demandé
         if normalize:
             # On normalize en divisant par la norme du vecteur
+            # (sauf vecteur nul: aucun mot du document dans l'index de reference)
             norm = sqrt(sum(x**2 for x in tf_idf_log.values()))
-            for word, weight in tf_idf_log.items():
-                tf_idf_log[word] = weight / norm
+            for term_id, weight in tf_idf_log.items():
+                tf_idf_log[term_id] = weight / norm if norm else 0
 
         return tf_idf_log
 
     def get_document_vector(self, doc_id, weight_type, index=None):
         '''
         Retourne vecteur de poids pour le document id demandé.
-        (vecteur de la forme {mot1: poids1, mot2: poids2, ...})
+        (vecteur de la forme {id mot1: poids1, id mot2: poids2, ...}, ids de mots de cet index)
 
         Args:
             - `weight_type` indique le type de poids a utiliser
@@ -212,24 +454,278 @@ class Index(object):
             - `index`: index a utliser pour calculer la dft (par default self).
                 Utile pour indexer une query par rapport a l'index d'une collection
         '''
-        index = index or self
+        ordinal = self.doc_ordinals.get(doc_id)
+        if ordinal is None:
+            raise ValueError("Unknown document: %s" % doc_id)
+        return self._vector(self.document_index[ordinal], weight_type, index or self)
 
+    def _vector(self, counts, weight_type, index):
+        '''
+        Retourne vecteur de poids pour les occurences de mots ({id mot: occurence}) données
+        (cf get_document_vector)
+        '''
         if weight_type == 'tf_idf':
-            return self._tf_idf(doc_id, False, index)
+            return self._tf_idf(counts, False, index)
         if weight_type == 'tf_idf_normalized':
-            return self._tf_idf(doc_id, True, index)
+            return self._tf_idf(counts, True, index)
         if weight_type == 'tf_idf_log':
-            return self._tf_idf_log(doc_id, False, index)
+            return self._tf_idf_log(counts, False, index)
         if weight_type == 'tf_idf_log_normalized':
-            return self._tf_idf_log(doc_id, True, index)
+            return self._tf_idf_log(counts, True, index)
         else:
             raise ValueError("Unsupported weight_type: %s" % weight_type)
 
-    def search_word(self, word):
+    def get_document_vectors(self, weight_type):
+        '''
+        Retourne les vecteurs de poids de tous les documents de l'index
+        (liste indexée par ordinal de document [{id mot1: poids1, ...}, ...]).
+        Les vecteurs sont calculés une seule fois par type de poids puis gardés en cache.
+        '''
+        if weight_type not in self._vectors_cache:
+            self._vectors_cache[weight_type] = [
+                self._vector(counts, weight_type, self) for counts in self.document_index
+            ]
+        return self._vectors_cache[weight_type]
+
+    def get_document_norms(self, weight_type):
+        '''
+        Retourne la norme du vecteur de poids de chaque document (array indexé par ordinal),
+        gardée en cache
+        '''
+        if weight_type not in self._norms_cache:
+            self._norms_cache[weight_type] = array('d', (
+                sqrt(sum(weight ** 2 for weight in vector.values()))
+                for vector in self.get_document_vectors(weight_type)
+            ))
+        return self._norms_cache[weight_type]
+
+    def get_field_vectors(self, field, weight_type):
+        '''
+        Retourne les vecteurs de poids du champ `field` de tous les documents
+        (liste indexée par ordinal de document [{id mot1: poids1, ...}, ...]), gardés en cache.
+        Les poids utilisent l'idf de l'index entier: seule la fréquence des mots est propre au champ.
+        '''
+        if field not in self.field_index:
+            raise ValueError("Unknown field: %s" % field)
+        key = (field, weight_type)
+        if key not in self._field_vectors_cache:
+            field_documents = self.field_document_index[field]
+            self._field_vectors_cache[key] = [
+                self._vector(field_documents[ordinal] if ordinal < len(field_documents) else {},
+                             weight_type, self)
+                for ordinal in range(self.documents_count)
+            ]
+        return self._field_vectors_cache[key]
+
+    def get_field_norms(self, field, weight_type):
+        '''
+        Retourne la norme du vecteur du champ `field` de chaque document (array indexé par ordinal),
+        gardée en cache
+        '''
+        key = (field, weight_type)
+        if key not in self._field_norms_cache:
+            self._field_norms_cache[key] = array('d', (
+                sqrt(sum(weight ** 2 for weight in vector.values()))
+                for vector in self.get_field_vectors(field, weight_type)
+            ))
+        return self._field_norms_cache[key]
+
+    def get_tiered_postings(self, weight_type, champions_count=None):
+        '''
+        Retourne les postings de chaque mot découpés en deux tiers
+        (dictionnaire de la forme {id mot: ([ordinal tier 1, ...], [ordinal tier 2, ...])}):
+            - tier 1: la "champion list" du mot, les `champions_count` documents (CHAMPIONS_COUNT
+              par défaut) ou le poids du mot est le plus fort
+            - tier 2: le reste des documents contenant le mot
+        Les documents de chaque tier sont triés par poids décroissant.
+        '''
+        champions_count = champions_count or self.CHAMPIONS_COUNT
+        key = (weight_type, champions_count)
+        if key in self._tiered_postings:
+            return self._tiered_postings[key]
+
+        # Poids normalisés {id mot: [(poids, ordinal), ...]}
+        weights = defaultdict(list)
+        norms = self.get_document_norms(weight_type)
+        for ordinal, vector in enumerate(self.get_document_vectors(weight_type)):
+            if not norms[ordinal]:
+                continue
+            for term_id, weight in vector.items():
+                if weight > 0:
+                    weights[term_id].append((weight / norms[ordinal], ordinal))
+
+        tiered_postings = {}
+        for term_id, postings in weights.items():
+            ordinals = [ordinal for _, ordinal in sorted(postings, key=lambda posting: -posting[0])]
+            tiered_postings[term_id] = (ordinals[:champions_count], ordinals[champions_count:])
+
+        self._tiered_postings[key] = tiered_postings
+        return tiered_postings
+
+    def get_document_signatures(self, weight_type, size=None):
+        '''
+        Retourne la signature de chaque document: ses `size` mots (SIGNATURE_SIZE par défaut)
+        de poids le plus fort, avec leur poids
+        (liste indexée par ordinal [[(id mot, poids), ...], ...], mots triés par poids décroissant)
+        '''
+        size = size or self.SIGNATURE_SIZE
+        key = (weight_type, size)
+        if key not in self._signatures_cache:
+            self._signatures_cache[key] = [
+                heapq.nlargest(size, [(term_id, weight) for term_id, weight in vector.items() if weight > 0],
+                               key=lambda item: (item[1], -item[0]))
+                for vector in self.get_document_vectors(weight_type)
+            ]
+        return self._signatures_cache[key]
+
+    def get_impact_postings(self, weight_type):
+        '''
+        Retourne les postings de chaque mot, triés par impact décroissant et non par id de document.
+        (dictionnaire de la forme {id mot: [(impact, [ordinal, ...]), ...]})
+
+        L'impact d'un mot dans un document est son poids divisé par la norme du vecteur du document,
+        c'est a dire sa contribution au cosinus avec la query.
+        Les impacts sont quantifiés sur IMPACT_LEVELS niveaux: les documents d'un meme niveau
+        forment un segment, ce qui permet de traiter les postings segment par segment.
+        '''
+        if weight_type in self._impact_postings:
+            return self._impact_postings[weight_type]
+
+        # Impacts exacts {id mot: {ordinal: impact}}
+        impacts = defaultdict(dict)
+        norms = self.get_document_norms(weight_type)
+        for ordinal, vector in enumerate(self.get_document_vectors(weight_type)):
+            if not norms[ordinal]:
+                continue
+            for term_id, weight in vector.items():
+                if weight > 0:
+                    impacts[term_id][ordinal] = weight / norms[ordinal]
+
+        # Quantification globale: on découpe [0, impact max] en IMPACT_LEVELS intervalles
+        max_impact = max([max(postings.values()) for postings in impacts.values()] or [0])
+        impact_postings = {}
+        for term_id, postings in impacts.items():
+            segments = defaultdict(list)
+            for ordinal, impact in postings.items():
+                level = int(ceil(impact / max_impact * self.IMPACT_LEVELS))
+                segments[level].append(ordinal)
+            # Chaque segment est représenté par l'impact au milieu de son intervalle,
+            # du plus fort au plus faible
+            impact_postings[term_id] = [
+                ((level - 0.5) * max_impact / self.IMPACT_LEVELS, sorted(ordinals))
+                for level, ordinals in sorted(segments.items(), reverse=True)
+            ]
+
+        self._impact_postings[weight_type] = impact_postings
+        return impact_postings
+
+    def search_word(self, word, field=None):
         '''
         Retourne la liste des ids des documents contenant le mot passé en argument
+        (dans le champ `field` si précisé: seuls les postings de ce champ sont parcourus)
         '''
+        if field is not None and field not in self.field_index:
+            raise ValueError("Unknown field: %s" % field)
         # Si le mot est dans les stop_words, on revoit tout les documents
         if word in self.stop_words:
             return self.documents_ids
-        return self.word_index[word].keys()
+        term_id = self.vocabulary.get(word)
+        if term_id is None:
+            return []
+        postings = self.word_index[term_id] if field is None else self.field_index[field].get(term_id, {})
+        return [self.doc_ordinals.key(ordinal) for ordinal in postings]
+
+    def get_positions(self, word, doc_id):
+        '''
+        Retourne la liste (croissante) des positions du mot dans le document
+        '''
+        return self._positions(self.vocabulary.get(word), self.doc_ordinals.get(doc_id))
+
+    def _positions(self, term_id, ordinal):
+        '''
+        Retourne la liste (croissante) des positions du mot d'id `term_id` dans le document d'ordinal donné
+        '''
+        if not self.positional:
+            raise ValueError("Index non positionnel: positions indisponibles")
+        if term_id is None:
+            return []
+        return decode_positions(self.positional_index[term_id].get(ordinal, b''))
+
+    def search_phrase(self, words):
+        '''
+        Retourne l'ensemble des ids des documents contenant la suite de mots `words`
+        (mots déja processés, a des positions consécutives)
+
+        On intersecte les postings en partant du mot le plus rare,
+        puis on intersecte les positions des mots (décalées de leur rang dans la phrase)
+        '''
+        # Phrase vide (que des stop words): comme pour un stop word, on renvoie tous les documents
+        if not words:
+            return set(self.documents_ids)
+        if not self.positional:
+            raise ValueError("Index non positionnel: recherche de phrase impossible")
+
+        term_ids = [self.vocabulary.get(word) for word in words]
+        if None in term_ids:  # mot absent de l'index
+            return set()
+        postings = [self.positional_index[term_id] for term_id in term_ids]
+        candidates = set(min(postings, key=len))
+        for word_postings in postings:
+            candidates &= set(word_postings)
+
+        results = set()
+        for ordinal in candidates:
+            # Positions de départ possibles de la phrase
+            starts = set(decode_positions(postings[0][ordinal]))
+            for offset in range(1, len(words)):
+                starts &= set(position - offset for position in decode_positions(postings[offset][ordinal]))
+                if not starts:
+                    break
+            if starts:
+                results.add(self.doc_ordinals.key(ordinal))
+        return results
+
+    def get_phrase_positions(self, words, doc_id):
+        '''
+        Retourne la liste (croissante) des positions de départ de la phrase `words` dans le document
+        '''
+        starts = set(self.get_positions(words[0], doc_id))
+        for offset in range(1, len(words)):
+            starts &= set(position - offset for position in self.get_positions(words[offset], doc_id))
+        return sorted(starts)
+
+    def proximity_window(self, term_ids, ordinal):
+        '''
+        Retourne un couple (nombre de mots trouvés, taille de la plus petite fenetre)
+        pour les mots d'ids `term_ids` présents dans le document d'ordinal donné:
+        la fenetre est la plus petite suite de positions contenant au moins une fois
+        chacun de ces mots.
+        '''
+        # Liste fusionnée et triée des (position, id mot)
+        occurences = sorted(
+            (position, term_id) for term_id in set(term_ids)
+            for position in self._positions(term_id, ordinal)
+        )
+        found = len(set(word for _, word in occurences))
+        if found == 0:
+            return 0, 0
+
+        # Fenetre glissante: on avance la fin, puis on resserre le début tant que tous les mots y sont
+        best = None
+        counts = defaultdict(int)
+        covered = 0
+        start = 0
+        for end, (end_position, end_word) in enumerate(occurences):
+            counts[end_word] += 1
+            if counts[end_word] == 1:
+                covered += 1
+            while covered == found:
+                start_position, start_word = occurences[start]
+                window = end_position - start_position + 1
+                if best is None or window < best:
+                    best = window
+                counts[start_word] -= 1
+                if counts[start_word] == 0:
+                    covered -= 1
+                start += 1
+        return found, best
@@ -0,0 +1,283 @@
+# coding=utf-8
+
+# Test de charge du moteur de recherche
+
+# On génère un flux de queries réaliste a partir des queries de reference de la collection
+# et des statistiques du vocabulaire de l'index:
+#   - queries de reference (recherche vectorielle)
+#   - queries de mots tirés selon une loi de Zipf sur les mots classés par frequence (dft)
+#   - queries booléennes (mots tirés selon la meme loi, reliés par AND / OR / NOT)
+#   - queries longues (plusieurs queries de reference mises bout a bout)
+#   - répétitions de queries déja envoyées (pour valider les caches)
+# Puis on rejoue ce flux contre les fonctions de recherche (dans le processus) ou contre
+# un index réparti (cf sharding.py, shards servis par d'autres processus, un seul client a la fois),
+# soit a concurrence fixée (N clients qui envoient une query des que la précédente est finie), soit a débit fixé
+# (QPS: les queries partent a heure fixe, la latence compte aussi l'attente avant traitement).
+# On affiche le débit obtenu, les percentiles et l'histogramme des latences et le taux d'erreurs,
+# globalement et par type de query.
+
+# Utilisation: python load_test.py --queries 1000 --concurrency 4
+#              python load_test.py --queries 1000 --qps 50 --shards 2
+
+import argparse
+from collections import defaultdict
+import random
+import threading
+import time
+
+try:
+    import queue
+except ImportError:  # python 2
+    import Queue as queue
+
+from collection import CACMCollection
+from index import Index
+from boolean_search import boolean_search
+from vectorial_search import vectorial_search
+from evaluation_utils import get_queries
+
+# Ponderation donnant les meilleurs resultats (cf evaluation.py)
+WEIGHT_TYPE = "tf_idf_log_normalized"
+
+# Proportion de chaque type de query dans le flux (les répétitions sont tirées a part)
+QUERY_MIX = {'reference': 0.4, 'zipf': 0.3, 'boolean': 0.2, 'long': 0.1}
+# Probabilité de renvoyer une query déja envoyée
+REPEAT_RATE = 0.2
+# Exposant de la loi de Zipf des mots des queries
+ZIPF_EXPONENT = 1.0
+# Nombre de mots des queries "zipf" et des queries booléennes
+QUERY_WORDS = (1, 4)
+# Nombre de queries de reference mises bout a bout dans une query longue
+LONG_QUERY_PARTS = (2, 4)
+
+# Mots réservés de la syntaxe booléenne (cf boolean_search)
+BOOLEAN_OPERATORS = ('and', 'or', 'not', 'near')
+
+# Bornes (en ms) des classes de l'histogramme des latences
+HISTOGRAM_BOUNDS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+PERCENTILES = [50, 90, 95, 99, 99.9]
+
+
+class ZipfSampler(object):
+    '''
+    Tire des mots de l'index selon une loi de Zipf: le mot de rang r (par frequence décroissante)
+    est tiré avec une probabilité proportionnelle a 1 / r ** exponent.
+    Seuls les mots qu'un utilisateur pourrait taper sont gardés: ceux qui redonnent le meme mot
+    une fois processés (pas "j." ni "(") et qui ne sont pas des opérateurs booléens
+    '''
+
+    def __init__(self, index, exponent=ZIPF_EXPONENT, rng=random):
+        words = [word for word in index.vocabulary.keys
+                 if word not in BOOLEAN_OPERATORS and index._text_to_words(word) == [word]]
+        self.words = sorted(words, key=lambda word: -index._dft(word))
+        self.rng = rng
+        self.cumulated_weights = []
+        total = 0.
+        for rank in range(1, len(self.words) + 1):
+            total += 1. / rank ** exponent
+            self.cumulated_weights.append(total)
+
+    def sample(self):
+        threshold = self.rng.random() * self.cumulated_weights[-1]
+        low, high = 0, len(self.cumulated_weights) - 1
+        while low < high:  # recherche dichotomique du premier poids cumulé >= threshold
+            middle = (low + high) // 2
+            if self.cumulated_weights[middle] < threshold:
+                low = middle + 1
+            else:
+                high = middle
+        return self.words[low]
+
+
+def generate_workload(index, reference_queries, count, seed=0, boolean=True):
+    '''
+    Retourne une liste de `count` triplets (type de query, modele de recherche, query) (cf QUERY_MIX).
+    Le type est "reference", "zipf", "boolean", "long" ou "repeat", le modele "vectorial" ou "boolean"
+    (celui de la query d'origine pour une répétition); les queries booléennes sont exclues
+    si `boolean` est faux.
+    '''
+    rng = random.Random(seed)
+    sampler = ZipfSampler(index, rng=rng)
+    reference_queries = [query.strip() for query in reference_queries if query.strip()]
+    mix = [(kind, share) for kind, share in sorted(QUERY_MIX.items()) if boolean or kind != 'boolean']
+    total_share = sum(share for _, share in mix)
+
+    workload = []
+    for _ in range(count):
+        if workload and rng.random() < REPEAT_RATE:
+            _, model, query = rng.choice(workload)
+            workload.append(('repeat', model, query))
+            continue
+        draw = rng.random() * total_share
+        for kind, share in mix:
+            draw -= share
+            if draw < 0:
+                break
+        if kind == 'reference':
+            query = rng.choice(reference_queries)
+        elif kind == 'zipf':
+            query = ' '.join(sampler.sample() for _ in range(rng.randint(*QUERY_WORDS)))
+        elif kind == 'long':
+            query = ' '.join(rng.choice(reference_queries) for _ in range(rng.randint(*LONG_QUERY_PARTS)))
+        else:
+            query = sampler.sample()
+            for _ in range(rng.randint(*QUERY_WORDS) - 1):
+                operator = rng.choice(['AND', 'AND', 'OR', 'AND NOT'])
+                query = '%s %s %s' % (query, operator, sampler.sample())
+        workload.append((kind, 'boolean' if kind == 'boolean' else 'vectorial', query))
+    return workload
+
+
+def replay(workload, search, concurrency=1, qps=None):
+    '''
+    Rejoue le flux de queries avec la fonction `search(modele de recherche, query)`.
+    - sans `qps`: `concurrency` clients envoient chacun une query des que la précédente est finie
+    - avec `qps`: les queries partent toutes les 1 / qps secondes et sont traitées par
+      `concurrency` workers; la latence est comptée depuis l'heure de départ prévue
+    Renvoie (durée totale, liste des (type de query, latence en s, erreur ou None))
+    '''
+    pending = queue.Queue()
+    results = []
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+            scheduled, (kind, model, query) = item
+            start = scheduled if scheduled is not None else time.time()
+            error = None
+            try:
+                search(model, query)
+            except Exception as exception:
+                error = type(exception).__name__
+            latency = time.time() - start
+            with lock:
+                results.append((kind, latency, error))
+
+    workers = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.time()
+    for thread in workers:
+        thread.daemon = True
+        thread.start()
+    for i, item in enumerate(workload):
+        scheduled = None
+        if qps:
+            scheduled = start + i / float(qps)
+            delay = scheduled - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        pending.put((scheduled, item))
+    for _ in workers:
+        pending.put(None)
+    for thread in workers:
+        thread.join()
+    return time.time() - start, results
+
+
+def percentile(sorted_values, rank):
+    '''
+    Percentile `rank` (méthode du rang le plus proche) d'une liste triée
+    '''
+    index = max(0, int(-(-len(sorted_values) * rank // 100)) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def histogram(latencies):
+    '''
+    Retourne le nombre de latences (en s) dans chaque classe de HISTOGRAM_BOUNDS (en ms)
+    sous la forme [(libellé de la classe, nombre)]
+    '''
+    counts = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+    for latency in latencies:
+        bucket = 0
+        while bucket < len(HISTOGRAM_BOUNDS) and latency * 1000 >= HISTOGRAM_BOUNDS[bucket]:
+            bucket += 1
+        counts[bucket] += 1
+    labels = ['< %s ms' % HISTOGRAM_BOUNDS[0]]
+    labels += ['%s - %s ms' % bounds for bounds in zip(HISTOGRAM_BOUNDS, HISTOGRAM_BOUNDS[1:])]
+    labels += ['>= %s ms' % HISTOGRAM_BOUNDS[-1]]
+    return list(zip(labels, counts))
+
+
+def print_report(duration, results):
+    '''
+    Affiche débit, percentiles et histogramme des latences et erreurs (globalement et par type)
+    '''
+    errors = [error for _, _, error in results if error]
+    print("Queries:      %s en %.2f s" % (len(results), duration))
+    print("Débit:        %.1f queries / s" % (len(results) / duration))
+    print("Erreurs:      %s (%.2f %%)" % (len(errors), 100. * len(errors) / max(1, len(results))))
+    errors_by_type = defaultdict(int)
+    for error in errors:
+        errors_by_type[error] += 1
+    for error, count in sorted(errors_by_type.items()):
+        print("    %-20s %s" % (error, count))
+
+    by_kind = defaultdict(list)
+    for kind, latency, _ in results:
+        by_kind[kind].append(latency)
+    print("\n")
+    print("type         queries   moyenne (ms)   " + "   ".join("p%-7s" % rank for rank in PERCENTILES))
+    for kind, latencies in [('total', [latency for _, latency, _ in results])] + sorted(by_kind.items()):
+        latencies = sorted(latencies)
+        print("%-12s %-9s %-14.2f " % (kind, len(latencies), 1000 * sum(latencies) / len(latencies))
+              + "   ".join("%-8.2f" % (1000 * percentile(latencies, rank)) for rank in PERCENTILES))
+
+    print("\n")
+    print("Histogramme des latences:")
+    buckets = histogram([latency for _, latency, _ in results])
+    largest = max(count for _, count in buckets) or 1
+    for label, count in buckets:
+        print("%-16s %-7s %s" % (label, count, '#' * int(round(50. * count / largest))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge du moteur de recherche")
+    parser.add_argument('--queries', type=int, default=1000, help="nombre de queries a envoyer")
+    parser.add_argument('--concurrency', type=int, default=1, help="nombre de clients (ou workers avec --qps)")
+    parser.add_argument('--qps', type=float, default=None, help="débit cible (queries / s)")
+    parser.add_argument('--shards', type=int, default=0,
+                        help="rejoue contre un index réparti sur N processus (recherche vectorielle uniquement, "
+                             "concurrence de 1)")
+    parser.add_argument('--seed', type=int, default=0, help="graine de la génération des queries")
+    arguments = parser.parse_args()
+
+    collection = CACMCollection()
+    index = Index(collection.documents)
+    workload = generate_workload(index, get_queries().values(), arguments.queries,
+                                 arguments.seed, boolean=not arguments.shards)
+
+    if arguments.shards:
+        from sharding import ShardedIndex
+        sharded_index = ShardedIndex(collection.documents, arguments.shards)
+        # Les pipes vers les shards ne sont utilisables que par un client a la fois: plusieurs clients
+        # seraient sérialisés, et les mesures ne seraient pas celles d'une charge concurrente
+        if arguments.concurrency > 1:
+            print("Index réparti: concurrence ramenée de %s a 1 (un seul client a la fois par shard)"
+                  % arguments.concurrency)
+            arguments.concurrency = 1
+
+        def search(model, query):
+            return sharded_index.search(query, WEIGHT_TYPE)
+    else:
+        sharded_index = None
+
+        def search(model, query):
+            if model == 'boolean':
+                return boolean_search(query, index)
+            return vectorial_search(query, index, WEIGHT_TYPE)
+
+    # Les vecteurs des documents sont mis en cache avant de commencer
+    search('vectorial', workload[0][2])
+    duration, results = replay(workload, search, arguments.concurrency, arguments.qps)
+    if sharded_index is not None:
+        sharded_index.close()
+    print("Concurrence:  %s%s" % (arguments.concurrency, " (index réparti)" if arguments.shards else ""))
+    print_report(duration, results)
+
+
+# Run uniquement si le script est appelé directement
+if __name__ == '__main__':
+    main()
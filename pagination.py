@@ -0,0 +1,47 @@
+# coding=utf-8
+from collections import namedtuple
+import heapq
+
+"""
+Pagination des résultats de recherche (cf vectorial_search_page et boolean_search_page).
+
+Les résultats sont représentés par leurs clés de tri (le meilleur résultat a la plus petite clé).
+Une page est obtenue sans trier l'ensemble des résultats:
+    - page(keys, size, after): sélection partielle (heap de taille size + 1) des clés qui suivent
+      le curseur `after`, la clé du dernier résultat de la page précédente. Le curseur est une
+      simple valeur: la recherche peut etre reprise plus tard (autre requete, autre processus)
+      a partir du curseur, tant que l'index n'a pas changé.
+    - iter_sorted(keys): générateur des clés dans l'ordre (heapify en O(n), puis un pop
+      en O(log n) par résultat consommé)
+"""
+
+# Nombre de résultats par page par défaut
+PAGE_SIZE = 10
+
+# Une page de résultats: les résultats, le curseur de la page suivante (None pour la derniere page)
+# et le nombre total de résultats de la recherche
+SearchPage = namedtuple("SearchPage", ['results', 'cursor', 'total'])
+
+
+def page(keys, size=PAGE_SIZE, after=None):
+    '''
+    Retourne les `size` plus petites clés de `keys` strictement supérieures a `after`
+    (toutes les clés si `after` est None), triées, et un booléen indiquant s'il reste
+    des clés après elles
+    '''
+    if size < 1:
+        raise ValueError("Invalid page size: %s" % size)
+    if after is not None:
+        keys = [key for key in keys if key > after]
+    selected = heapq.nsmallest(size + 1, keys)
+    return selected[:size], len(selected) > size
+
+
+def iter_sorted(keys):
+    '''
+    Générateur des clés de `keys` dans l'ordre croissant, triées au fur et a mesure
+    '''
+    heap = list(keys)
+    heapq.heapify(heap)
+    while heap:
+        yield heapq.heappop(heap)
@@ -0,0 +1,128 @@
+# coding=utf-8
+from array import array
+from math import sqrt
+
+from vectorial_search import MIN_SIMILARITY, SearchResult, _query_vector
+
+"""
+Stockage compact (quantifié) des vecteurs de documents pour la recherche vectorielle.
+
+Les vecteurs de l'index sont des dicts de floats python (plusieurs dizaines d'octets par poids).
+Ici, les poids sont rangés par mot dans des arrays contigus (format CSR):
+    - offsets[id mot] .. offsets[id mot + 1]: tranche des postings du mot
+    - ordinals[i]: ordinal du document du posting i
+    - weights[i]: poids quantifié du posting i
+Précisions disponibles (cf PRECISIONS):
+    - "float64" et "float32": poids stockés tels quels (8 ou 4 octets)
+    - "uint16" et "int8": poids entiers (2 ou 1 octet), avec un facteur d'échelle par document:
+      poids ~= poids entier * scales[ordinal], l'échelle étant poids max du document / entier max
+La recherche parcourt uniquement les postings des mots de la query (term-at-a-time) et calcule
+le cosinus avec la norme (précalculée) des vecteurs quantifiés.
+"""
+
+# {précision: (typecode de l'array des poids, entier max ou None pour les flottants)}
+PRECISIONS = {
+    'float64': ('d', None),
+    'float32': ('f', None),
+    'uint16': ('H', 2 ** 16 - 1),
+    'int8': ('b', 2 ** 7 - 1),
+}
+
+
+class QuantizedVectors(object):
+    '''
+    Vecteurs des documents d'un index, quantifiés et rangés par mot (cf module).
+
+    Arguments:
+        - (Index) index: index de la collection
+        - (str) weight_type: type de poids des vecteurs de documents (cf Index.get_document_vector)
+        - (str) precision: optionel, précision des poids (cf PRECISIONS)
+    '''
+
+    def __init__(self, index, weight_type, precision='float32'):
+        if precision not in PRECISIONS:
+            raise ValueError("Unsupported precision: %s" % precision)
+        self.index = index
+        self.weight_type = weight_type
+        self.precision = precision
+        typecode, max_value = PRECISIONS[precision]
+        vectors = index.get_document_vectors(weight_type)
+
+        # Facteur d'échelle de chaque document (poids entiers uniquement)
+        self.scales = array('f')
+        if max_value is not None:
+            for vector in vectors:
+                largest = max([abs(weight) for weight in vector.values()] or [0])
+                self.scales.append(largest / max_value if largest else 1.)
+
+        # Postings de chaque mot, dans l'ordre des ordinaux
+        postings = [[] for _ in range(len(index.vocabulary))]
+        for ordinal, vector in enumerate(vectors):
+            for term_id, weight in vector.items():
+                if weight:
+                    postings[term_id].append((ordinal, weight))
+
+        self.offsets = array('I', [0])
+        self.ordinals = array('I')
+        self.weights = array(typecode)
+        for term_postings in postings:
+            for ordinal, weight in term_postings:
+                self.ordinals.append(ordinal)
+                if max_value is None:
+                    self.weights.append(weight)
+                else:
+                    self.weights.append(int(round(weight / self.scales[ordinal])))
+            self.offsets.append(len(self.ordinals))
+
+        # Normes des vecteurs quantifiés
+        squares = [0.] * len(vectors)
+        for i, ordinal in enumerate(self.ordinals):
+            squares[ordinal] += self.weight(i) ** 2
+        self.norms = array('f', [sqrt(square) for square in squares])
+
+    def weight(self, i):
+        '''
+        Poids (déquantifié) du posting i
+        '''
+        if self.scales:
+            return self.weights[i] * self.scales[self.ordinals[i]]
+        return self.weights[i]
+
+    @property
+    def size(self):
+        '''
+        Taille (en octets) des arrays du stockage
+        '''
+        return sum(values.itemsize * len(values)
+                   for values in (self.offsets, self.ordinals, self.weights, self.scales, self.norms))
+
+
+def quantized_search(querystring, vectors):
+    '''
+    Recherche vectorielle de `querystring` sur les vecteurs quantifiés `vectors` (QuantizedVectors).
+    Renvoie les résultats de similarité > MIN_SIMILARITY, ordonnés par similarité
+    (comme vectorial_search)
+    '''
+    index = vectors.index
+    query_vector = _query_vector(querystring, index, vectors.weight_type)
+    norm_query = sqrt(sum(weight ** 2 for weight in query_vector.values()))
+    if not norm_query:
+        return []
+
+    # Produits scalaires accumulés sur les postings des mots de la query
+    products = {}  # {ordinal: produit scalaire}
+    offsets, ordinals, weights, scales = vectors.offsets, vectors.ordinals, vectors.weights, vectors.scales
+    for term_id, query_weight in query_vector.items():
+        if not query_weight:
+            continue
+        for i in range(offsets[term_id], offsets[term_id + 1]):
+            ordinal = ordinals[i]
+            weight = weights[i] * scales[ordinal] if scales else weights[i]
+            products[ordinal] = products.get(ordinal, 0.) + query_weight * weight
+
+    norms = vectors.norms
+    search_results = [SearchResult(index.doc_ordinals.key(ordinal), product / (norm_query * norms[ordinal]))
+                      for ordinal, product in products.items()]
+    # A similarité égale, ordre des ordinaux (comme vectorial_search)
+    search_results.sort(key=lambda result: (-result.similarity, index.doc_ordinals.get(result.doc_id)))
+    return [result for result in search_results if result.similarity > MIN_SIMILARITY]
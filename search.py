@@ -10,10 +10,18 @@ import sys
 
 from collection import CACMCollection
 from index import Index
-from vectorial_search import vectorial_search
-from boolean_search import boolean_search
+from vectorial_search import vectorial_search_page, filtered_search, similar_documents
+from boolean_search import boolean_search_page
+from pagination import PAGE_SIZE, SearchPage
+from snippets import query_terms, snippet
+from spelling import query_corrections
 from evaluation_utils import time_func
 
+# Nombre de documents similaires affichés pour chaque résultat, et ponderation utilisée pour les trouver
+# (celle donnant les meilleurs resultats, cf evaluation.py)
+SIMILAR_DOCUMENTS_COUNT = 3
+SIMILAR_DOCUMENTS_WEIGHT_TYPE = "tf_idf_log_normalized"
+
 
 def choose_collection():
     """
@@ -31,7 +39,7 @@ def choose_collection():
         print("Collection CACM importée en %s secondes" % (import_time))
 
         # index
-        index_time, index = time_func(Index, collection.documents)
+        index_time, index = time_func(Index, collection.documents, positional=True)
         print("Collection CACM indéxée en %s secondes" % (index_time))
         print("Taille de l'index en mémoire: ~ %s Méga-octets"
               % (sys.getsizeof(index) / float(10**6)))
@@ -59,6 +67,7 @@ def choose_search_type():
     print('1 - Recherche vectorielle')
     print('2 - Recherche booléenne')
     print('3 - Recherche probabiliste (non implémenté pour le moment)')
+    print('4 - Recherche vectorielle filtrée par une query booléenne')
     print('0 - quitter')
     search_choice = input('Choisissez un type de recherche: ')
     print('\n')
@@ -66,6 +75,8 @@ def choose_search_type():
         return "vectorial"
     if search_choice == 2:
         return "boolean"
+    if search_choice == 4:
+        return "filtered"
     if search_choice == 0:
         sys.exit(0)
     else:
@@ -108,27 +119,113 @@ def choose_query_bool():
     print('Format de la query:')
     print('    - Opérateurs acceptés: "(", ")", "AND", "OR", "NOT"')
     print('    - Un espace est considéré comme un AND')
+    print('    - "mot1 mot2" recherche la phrase exacte')
+    print('    - "A NEAR B" (ou "A NEAR/k B") recherche A et B a moins de 5 (ou k) mots d\'écart')
+    print('    - * remplace n\'importe quelle suite de lettres (ex: comput*)')
+    print('    - champ:mot ne recherche le mot que dans un champ: title, summary, keywords ou author (ex: author:knuth)')
     print('    - Le nombre de parenthèses ouvertes doit matcher le nombre de parenthèses fermées')
     query = raw_input("Entrez votre query: ")
     print('\n')
     return query
 
 
-def print_results_vectorial_search(search_results, query, collection):
+def print_corrections(query, index):
+    """
+    Affiche les corrections des mots de la query absents de l'index (la recherche est faite avec
+    les mots corrigés)
+    """
+    corrections = query_corrections(query, index)
+    if corrections:
+        print("Mots corrigés: %s" % ", ".join("%s -> %s" % (word, correction)
+                                               for word, correction in sorted(corrections.items())))
+
+
+def similar_documents_line(doc_id, index):
+    """
+    Retourne la ligne listant les ids des documents les plus similaires au document
+    (cf vectorial_search.similar_documents)
+    """
+    similar = similar_documents(doc_id, index, SIMILAR_DOCUMENTS_WEIGHT_TYPE, SIMILAR_DOCUMENTS_COUNT)
+    return "Documents similaires: %s" % ", ".join(str(result.doc_id) for result in similar)
+
+
+def browse_pages(search_page, next_page, print_result):
+    """
+    Affiche les résultats page par page, tant que l'utilisateur demande la page suivante.
+    `next_page(curseur)` renvoie la page qui suit le curseur (cf pagination.py)
+    """
+    while True:
+        for result in search_page.results:
+            print_result(result)
+        if search_page.cursor is None or raw_input('Page suivante ? (o/n) ') != 'o':
+            return
+        print('\n')
+        search_page = next_page(search_page.cursor)
+
+
+def print_results_vectorial_search(search_page, next_page, query, collection, index):
     """
-    Demande le nombre de résultats à afficher et les affichent
+    Affiche les résultats page par page (avec un extrait de chaque document)
     """
-    print('%s resultats pour la recherche "%s"' % (len(search_results), query))
-    nb_doc_to_show = input('Combien de résultats (trier par ordre décroissant de similarité voulez vous afficher ? ')
+    print('%s resultats pour la recherche "%s"' % (search_page.total, query))
     print('\n')
-    for (doc_id, similarity) in search_results[:nb_doc_to_show]:
-        print("Document: %sSimilarité: %s \n" % (collection.get_document_by_id(doc_id), similarity))
+    terms = query_terms(query, index, correct_spelling=True)
+
+    def print_result(search_result):
+        doc_id, similarity = search_result
+        document = collection.get_document_by_id(doc_id)
+        print("Document: %s%s\nSimilarité: %s \n%s\n" % (document, snippet(document, index, terms), similarity,
+                                                         similar_documents_line(doc_id, index)))
+
+    browse_pages(search_page, next_page, print_result)
+
+
+def print_results_boolean_search(search_page, next_page, query, collection, index):
+    print('%s resultats pour la recherche "%s"' % (search_page.total, query))
+    terms = query_terms(query, index, boolean=True, correct_spelling=True)
 
+    def print_result(doc_id):
+        document = collection.get_document_by_id(doc_id)
+        print("%s%s\n%s\n" % (document, snippet(document, index, terms), similar_documents_line(doc_id, index)))
 
-def print_results_boolean_search(search_results, query, collection):
-    print('%s resultats pour la recherche "%s"' % (len(search_results), query))
-    for doc_id in search_results:
-        print("%s" % collection.get_document_by_id(doc_id))
+    browse_pages(search_page, next_page, print_result)
+
+
+def run_search(search_type, collection, index):
+    """
+    Demande la query du type de recherche choisi, effectue la recherche et affiche les résultats
+    """
+    if search_type == "vectorial":
+        weight = choose_weight_type()
+        query = choose_query()
+        # Seule la premiere page est calculée (puis chaque page demandée, a partir du curseur)
+        next_page = lambda cursor: vectorial_search_page(query, index, weight, page_size=PAGE_SIZE, after=cursor,
+                                                         correct_spelling=True)
+        search_time, search_page = time_func(next_page, None)
+        print_corrections(query, index)
+        print("Temps d'exécution de la recherche: %s secondes" % (search_time))
+        print_results_vectorial_search(search_page, next_page, query, collection, index)
+
+    if search_type == "filtered":
+        weight = choose_weight_type()
+        filter_query = choose_query_bool()
+        query = choose_query()
+        search_time, search_results = time_func(filtered_search, query, filter_query, index, weight,
+                                                correct_spelling=True)
+        print_corrections(filter_query + " " + query, index)
+        print("Temps d'exécution de la recherche: %s secondes" % (search_time))
+        # Les k résultats sont affichés sur une seule page
+        print_results_vectorial_search(SearchPage(search_results, None, len(search_results)), None,
+                                       query, collection, index)
+
+    if search_type == "boolean":
+        query = choose_query_bool()
+        next_page = lambda cursor: boolean_search_page(query, index, page_size=PAGE_SIZE, after=cursor,
+                                                       correct_spelling=True)
+        search_time, search_page = time_func(next_page, None)
+        print_corrections(query, index)
+        print("Temps d'exécution de la recherche: %s secondes" % (search_time))
+        print_results_boolean_search(search_page, next_page, query, collection, index)
 
 
 # Run uniquement si le script est appelé directement
@@ -138,16 +235,7 @@ if __name__ == '__main__':
 
     while True:  # la possibilite de quitter est dans le choix du type de recherche
         search_type = choose_search_type()
-
-        if search_type == "vectorial":
-            weight = choose_weight_type()
-            query = choose_query()
-            search_time, search_results = time_func(vectorial_search, query, index, weight)
-            print("Temps d'exécution de la recherche: %s secondes" % (search_time))
-            print_results_vectorial_search(search_results, query, collection)
-
-        if search_type == "boolean":
-            query = choose_query_bool()
-            search_time, search_results = time_func(boolean_search, query, index)
-            print("Temps d'exécution de la recherche: %s secondes" % (search_time))
-            print_results_boolean_search(search_results, query, collection)
+        try:
+            run_search(search_type, collection, index)
+        except ValueError as error:  # query invalide (ex: NEAR appliqué a un NOT)
+            print("Recherche impossible: %s" % error)
@@ -0,0 +1,222 @@
+# coding=utf-8
+import heapq
+from math import sqrt
+from multiprocessing import Pipe, Process
+
+from documents import QueryDocument
+from index import Index
+from vectorial_search import MIN_SIMILARITY, SearchResult
+
+"""
+Recherche vectorielle répartie ("scatter-gather") sur plusieurs shards.
+
+La collection est découpée en N shards (tranches contiguës de documents), chacun indexé
+et servi par son propre processus. Le coordinateur communique avec les shards par des pipes:
+    - a la construction, chaque shard renvoie ses statistiques (nombre de documents, frequence
+      de chaque mot), que le coordinateur agrège en statistiques globales et renvoie aux shards
+    - a la recherche, le coordinateur calcule le vecteur de la query avec les statistiques globales,
+      l'envoie a tous les shards, puis fusionne leurs top-k
+
+Les poids des documents et de la query sont calculés avec les statistiques globales (nombre total
+de documents, frequence totale des mots): les similarités sont exactement celles d'un index unique.
+"""
+
+
+class GlobalStatistics(object):
+    '''
+    Statistiques globales de la collection répartie sur les shards.
+    Peut etre utilisé comme index de reference pour le calcul des poids
+    (cf argument `index` de Index.get_document_vector).
+
+    Arguments:
+        - shards_statistics: liste des couples (nombre de documents, {mot: frequence}) des shards
+    '''
+
+    def __init__(self, shards_statistics):
+        self.documents_count = 0
+        self.frequencies = {}  # {mot: nombre de documents contenant le mot}
+        for documents_count, frequencies in shards_statistics:
+            self.documents_count += documents_count
+            for word, dft in frequencies.items():
+                self.frequencies[word] = self.frequencies.get(word, 0) + dft
+
+    def _dft(self, word):
+        '''
+        Retourne frequence du mot dans la collection (nombre de docs avec ce mot)
+        '''
+        return self.frequencies.get(word, 0)
+
+
+class ShardedIndex(object):
+    '''
+    Index réparti sur `shards_count` processus (cf module).
+
+    Arguments:
+        - documents: documents de la collection (cf documents.Document), découpés dans cet ordre
+          en `shards_count` tranches contiguës
+        - (int) shards_count: nombre de shards
+        - (str) analyzer: optionel, analyseur de texte des shards et des queries (cf Index)
+
+    Les processus des shards sont arretés par `close` (ou en sortie d'un bloc `with`).
+    '''
+
+    def __init__(self, documents, shards_count=2, analyzer='nltk'):
+        if shards_count < 1:
+            raise ValueError("Invalid shards_count: %s" % shards_count)
+        self.analyzer = analyzer
+        documents = list(documents)
+        size = -(-len(documents) // shards_count)  # taille des tranches, arrondie au dessus
+        self._connections = []
+        self._processes = []
+        for shard in range(shards_count):
+            connection, shard_connection = Pipe()
+            process = Process(target=_serve_shard,
+                              args=(shard_connection, documents[shard * size:(shard + 1) * size], analyzer))
+            process.daemon = True
+            process.start()
+            self._connections.append(connection)
+            self._processes.append(process)
+
+        self.statistics = GlobalStatistics(self._broadcast('statistics'))
+        self._broadcast('set_statistics', self.statistics)
+
+    @property
+    def shards_count(self):
+        return len(self._connections)
+
+    @property
+    def documents_count(self):
+        return self.statistics.documents_count
+
+    def search(self, querystring, weight_type, k=None):
+        '''
+        Recherche vectorielle de `querystring` sur tous les shards en utilisant les poids de type
+        `weight_type`. Renvoie les `k` meilleurs résultats (tous si k est None) de similarité
+        > MIN_SIMILARITY, ordonnés par similarité (comme vectorial_search sur un index unique)
+        '''
+        query_doc = QueryDocument(querystring)
+        query_index = Index([query_doc], analyzer=self.analyzer)
+        query_vector = query_index.get_document_vector(query_doc.id, weight_type, self.statistics)
+        # Vecteur exprimé avec les mots (le vocabulaire de chaque shard est différent),
+        # dans l'ordre des mots de la query. Les mots absents de la collection (poids nul) sont ignorés
+        query_weights = [(query_index.vocabulary.key(term_id), weight)
+                         for term_id, weight in query_vector.items() if self.statistics._dft(
+                             query_index.vocabulary.key(term_id))]
+        norm_query = sqrt(sum(weight ** 2 for _, weight in query_weights))
+        if not norm_query:
+            return []
+
+        shards_results = self._broadcast('search', query_weights, norm_query, weight_type, k)
+        # Les tranches sont dans l'ordre des documents: a similarité égale, la fusion (stable)
+        # garde l'ordre d'un index unique
+        merged = heapq.merge(*[[(-similarity, shard, rank, doc_id)
+                                for rank, (doc_id, similarity) in enumerate(results)]
+                               for shard, results in enumerate(shards_results)])
+        search_results = [SearchResult(doc_id, -similarity) for similarity, _, _, doc_id in merged]
+        return search_results if k is None else search_results[:k]
+
+    def close(self):
+        '''
+        Arrete les processus des shards
+        '''
+        for connection in self._connections:
+            connection.send(('stop', ()))
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections = []
+        self._processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _broadcast(self, command, *args):
+        '''
+        Envoie la commande a tous les shards, puis attend leurs réponses (les shards travaillent
+        donc en parallèle). Renvoie la liste des réponses, dans l'ordre des shards
+        '''
+        for connection in self._connections:
+            connection.send((command, args))
+        responses = [connection.recv() for connection in self._connections]
+        for status, response in responses:
+            if status == 'error':
+                raise ValueError("Shard error: %s" % response)
+        return [response for _, response in responses]
+
+
+def _serve_shard(connection, documents, analyzer):
+    '''
+    Boucle d'un processus shard: indexe ses documents puis répond aux commandes du coordinateur
+    jusqu'a la commande "stop"
+    '''
+    shard = _Shard(documents, analyzer)
+    while True:
+        command, args = connection.recv()
+        if command == 'stop':
+            break
+        try:
+            connection.send(('ok', getattr(shard, command)(*args)))
+        except Exception as error:
+            connection.send(('error', repr(error)))
+    connection.close()
+
+
+class _Shard(object):
+    '''
+    Index d'un shard, avec ses vecteurs de documents calculés avec les statistiques globales
+    '''
+
+    def __init__(self, documents, analyzer):
+        self.index = Index(documents, analyzer=analyzer)
+        self.global_statistics = None
+        self._vectors_cache = {}  # {weight_type: ([vecteur de chaque ordinal], [norme de chaque ordinal])}
+
+    def statistics(self):
+        '''
+        Retourne le nombre de documents du shard et la frequence de chacun de ses mots
+        '''
+        index = self.index
+        frequencies = dict((word, len(index.word_index[term_id]))
+                           for term_id, word in enumerate(index.vocabulary.keys))
+        return index.documents_count, frequencies
+
+    def set_statistics(self, global_statistics):
+        self.global_statistics = global_statistics
+        self._vectors_cache = {}
+
+    def _vectors(self, weight_type):
+        '''
+        Vecteurs (et leurs normes) des documents du shard, pondérés avec les statistiques globales
+        '''
+        if weight_type not in self._vectors_cache:
+            vectors = [self.index._vector(counts, weight_type, self.global_statistics)
+                       for counts in self.index.document_index]
+            norms = [sqrt(sum(weight ** 2 for weight in vector.values())) for vector in vectors]
+            self._vectors_cache[weight_type] = (vectors, norms)
+        return self._vectors_cache[weight_type]
+
+    def search(self, query_weights, norm_query, weight_type, k):
+        '''
+        Compare la query ([(mot, poids)], de norme `norm_query`) a tous les documents du shard.
+        Renvoie les `k` meilleurs (doc_id, similarité) de similarité > MIN_SIMILARITY,
+        ordonnés par similarité
+        '''
+        if self.global_statistics is None:
+            raise ValueError("Shard statistics not set")
+        vocabulary = self.index.vocabulary
+        query_vector = [(vocabulary.get(word), weight) for word, weight in query_weights
+                        if word in vocabulary]
+        vectors, norms = self._vectors(weight_type)
+
+        results = []
+        for ordinal, doc_vector in enumerate(vectors):
+            similarity = sum(weight * doc_vector.get(term_id, 0.) for term_id, weight in query_vector)
+            if similarity:
+                similarity = similarity / (norm_query * norms[ordinal])
+            if similarity > MIN_SIMILARITY:
+                results.append((self.index.doc_ordinals.key(ordinal), similarity))
+        results.sort(key=lambda result: -result[1])
+        return results if k is None else results[:k]
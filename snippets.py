@@ -0,0 +1,115 @@
+# coding=utf-8
+from collections import defaultdict
+import re
+
+from boolean_search import FieldToken, WildcardNode, _correct_token, _is_wildcard, _tokenize_query
+from spelling import correct_words
+
+"""
+Extraits ("snippets") des documents trouvés par une recherche, avec mise en évidence
+des mots de la query.
+
+Les extraits sont calculés a partir des positions des mots dans le texte, gardées par l'index
+a l'indexation (cf Index.token_offsets): le texte des documents n'est pas re-processé.
+On choisit la fenetre de SNIPPET_WORDS mots (après preprocessing) contenant le plus de mots
+différents de la query (puis le plus d'occurences), qu'on découpe dans le texte du document.
+"""
+
+# Taille des extraits, en nombre de mots après preprocessing (les stop words ne comptent pas)
+SNIPPET_WORDS = 15
+
+# Marqueurs entourant les mots de la query dans les extraits
+HIGHLIGHT_START = "**"
+HIGHLIGHT_END = "**"
+
+# Suites d'espaces (dont retours a la ligne) a remplacer par un seul espace dans les extraits
+WHITESPACES = re.compile(r'\s+')
+
+
+def query_terms(query, index, boolean=False, correct_spelling=False):
+    '''
+    Retourne l'ensemble des ids (dans `index`) des mots de la query.
+    Pour une query booléenne, les opérateurs sont ignorés et les mots avec joker étendus.
+    Si `correct_spelling`, ce sont les mots corrigés (cf spelling.py)
+    '''
+    if not boolean:
+        words = index._text_to_words(query)
+        if correct_spelling:
+            words = correct_words(words, index)
+    else:
+        words = []
+        for token in _tokenize_query(query, index):
+            if correct_spelling:
+                token = _correct_token(token, index)
+            if isinstance(token, FieldToken):
+                token = token.word
+            if isinstance(token, tuple):  # phrase
+                words += token
+            elif _is_wildcard(token):
+                words += WildcardNode(index, token).expand()
+            else:
+                words.append(token)
+    terms = set(index.vocabulary.get(word) for word in words)
+    terms.discard(None)
+    return terms
+
+
+def best_window(offsets, terms, size=SNIPPET_WORDS):
+    '''
+    Retourne (premier mot, dernier mot) de la fenetre de `size` mots du document contenant
+    le plus de mots différents de `terms`, puis le plus d'occurences de ces mots.
+    `offsets` est le tableau des positions des mots du document (cf Index.token_offsets).
+    Sans mot de la query dans le document, la fenetre est le début du document.
+    '''
+    words_count = len(offsets) // 3
+    hits = [position for position in range(words_count) if offsets[3 * position + 2] in terms]
+    best, best_score = 0, (0, 0)
+    counts = defaultdict(int)  # occurences de chaque mot de la query dans la fenetre
+    # Fenetre glissante commencant a chaque occurence: [hits[i], hits[i] + size)
+    end = 0
+    for start in range(len(hits)):
+        while end < len(hits) and hits[end] < hits[start] + size:
+            counts[offsets[3 * hits[end] + 2]] += 1
+            end += 1
+        score = (len(counts), end - start)
+        if score > best_score:
+            best, best_score = hits[start], score
+        term_id = offsets[3 * hits[start] + 2]
+        counts[term_id] -= 1
+        if not counts[term_id]:
+            del counts[term_id]
+    # La fenetre est reculée si elle dépasse la fin du document
+    first = max(0, min(best, words_count - size))
+    return first, min(words_count, first + size) - 1
+
+
+def snippet(document, index, terms, size=SNIPPET_WORDS):
+    '''
+    Retourne l'extrait du document (cf documents.Document) le plus pertinent pour les mots
+    `terms` (ids de mots de `index`, cf query_terms), avec ces mots mis en évidence
+    '''
+    ordinal = index.doc_ordinals.get(document.id)
+    if ordinal is None:
+        raise ValueError("Unknown document: %s" % document.id)
+    offsets = index.token_offsets[ordinal]
+    text = document.text
+    if not offsets:
+        return ""
+    first, last = best_window(offsets, terms, size)
+
+    # Découpage du texte de la fenetre, en entourant les mots de la query
+    parts = []
+    position = offsets[3 * first]
+    for word in range(first, last + 1):
+        start, end, term_id = offsets[3 * word:3 * word + 3]
+        if term_id in terms:
+            parts += [text[position:start], HIGHLIGHT_START, text[start:end], HIGHLIGHT_END]
+            position = end
+    parts.append(text[position:offsets[3 * last + 1]])
+
+    extract = WHITESPACES.sub(' ', ''.join(parts))
+    if first > 0:
+        extract = "..." + extract
+    if last < len(offsets) // 3 - 1:
+        extract += "..."
+    return extract
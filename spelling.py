@@ -0,0 +1,200 @@
+# coding=utf-8
+from collections import Counter
+import re
+
+"""
+Correction orthographique des mots des queries.
+
+Un mot mal orthographié n'est pas dans l'index: il ne renvoie aucun document en recherche
+booléenne et a un poids nul en recherche vectorielle. On le remplace par le mot (processé) du
+vocabulaire le plus proche, trouvé sans parcourir tout le vocabulaire:
+    - index de k-grams: chaque mot du vocabulaire, entouré de marqueurs de début et de fin,
+      est découpé en k-grams de caractères ($comput$ -> $c, co, om, mp, pu, ut, t$ pour k = 2).
+      Pour chaque k-gram et chaque longueur de mot, on garde la liste des mots qui le contiennent.
+    - a distance d'édition <= d, les longueurs des mots different d'au plus d: seules les listes
+      de ces longueurs sont parcourues, et le nombre de k-grams communs a chaque mot est compté
+    - un mot a distance <= d d'un autre partage avec lui au moins n - (k + 1) * d de ses n k-grams
+      (chaque opération d'édition en détruit au plus k + 1): les autres mots sont écartés
+    - les candidats restants sont filtrés par leur similarité de Jaccard (sur les k-grams) puis
+      par une distance d'édition bornée (calcul arreté des que la borne est dépassée)
+    - les corrections sont classées par distance d'édition, puis par frequence dans l'index.
+      Les distances sont essayées dans l'ordre (1 puis 2): la plupart des fautes sont a distance 1,
+      et les corrections a distance 2 ne sont alors cherchées que s'il en faut plus.
+"""
+
+# Taille des k-grams
+GRAM_SIZE = 2
+# Marqueur de début et de fin de mot
+BOUNDARY = '$'
+# Similarité de Jaccard (sur les k-grams) minimum des candidats
+MIN_JACCARD = 0.3
+# Distance d'édition maximum selon la longueur du mot: pas de correction des mots de moins
+# de 3 lettres, 1 jusqu'a 4 lettres, 2 au dela
+MIN_LENGTH = 3
+SHORT_WORD_LENGTH = 4
+
+# Mots (et morceaux de mots) d'une query a corriger, avec leur position
+QUERY_WORD = re.compile(r"[\w'\-.]+", re.UNICODE)
+# Mots réservés de la syntaxe booléenne (cf boolean_search), jamais corrigés
+RESERVED_WORDS = ('and', 'or', 'not', 'near')
+
+
+def grams(word, size=GRAM_SIZE):
+    '''
+    Retourne l'ensemble des k-grams du mot entouré des marqueurs de début et de fin
+    '''
+    word = BOUNDARY + word + BOUNDARY
+    return set(word[i:i + size] for i in range(len(word) - size + 1))
+
+
+def max_distance(word):
+    '''
+    Distance d'édition maximum d'une correction du mot
+    '''
+    if len(word) < MIN_LENGTH:
+        return 0
+    return 1 if len(word) <= SHORT_WORD_LENGTH else 2
+
+
+def edit_distance(word, other, bound):
+    '''
+    Distance d'édition (insertions, suppressions, substitutions et inversions de deux lettres
+    voisines) entre `word` et `other`, ou bound + 1 si elle dépasse `bound`
+    (le calcul s'arrete des qu'une ligne de la matrice dépasse la borne)
+    '''
+    if abs(len(word) - len(other)) > bound:
+        return bound + 1
+    # Seules les cases a moins de `bound` de la diagonale sont calculées (les autres valent bound + 1)
+    too_far = bound + 1
+    before_previous = None
+    previous = [j if j <= bound else too_far for j in range(len(other) + 1)]
+    # (comparaisons explicites plutot que min(): c'est la boucle la plus appelée de la correction)
+    for i, char in enumerate(word, 1):
+        current = [i if i <= bound else too_far] + [too_far] * len(other)
+        row_min = current[0]
+        for j in range(max(1, i - bound), min(len(other), i + bound) + 1):
+            other_char = other[j - 1]
+            distance = previous[j - 1] if char == other_char else previous[j - 1] + 1
+            if previous[j] + 1 < distance:
+                distance = previous[j] + 1
+            if current[j - 1] + 1 < distance:
+                distance = current[j - 1] + 1
+            if (j > 1 and i > 1 and char == other[j - 2] and word[i - 2] == other_char
+                    and before_previous[j - 2] + 1 < distance):
+                distance = before_previous[j - 2] + 1
+            if distance > too_far:
+                distance = too_far
+            current[j] = distance
+            if distance < row_min:
+                row_min = distance
+        if row_min > bound:
+            return too_far
+        before_previous, previous = previous, current
+    return previous[-1]
+
+
+class SpellingCorrector(object):
+    '''
+    Index de k-grams du vocabulaire d'un index, pour corriger les mots des queries (cf module)
+
+    Arguments:
+        - words: les mots (déja processés) du vocabulaire
+        - frequency: fonction donnant la frequence d'un mot (nombre de documents le contenant),
+          utilisée pour départager les candidats
+    '''
+
+    def __init__(self, words, frequency):
+        self.words = list(words)
+        self._ids = dict((word, word_id) for word_id, word in enumerate(self.words))
+        self.frequency = frequency
+        self.grams_counts = []  # nombre de k-grams de chaque mot
+        self.postings = {}  # {(k-gram, longueur de mot): [id des mots le contenant]}
+        for word_id, word in enumerate(self.words):
+            word_grams = grams(word)
+            self.grams_counts.append(len(word_grams))
+            for gram in word_grams:
+                self.postings.setdefault((gram, len(word)), []).append(word_id)
+
+    def __contains__(self, word):
+        return word in self._ids
+
+    def suggest(self, word, count=5):
+        '''
+        Retourne les (au plus `count`) mots du vocabulaire les plus proches de `word`,
+        sous la forme [(mot, distance d'édition)], classés par distance puis par frequence décroissante
+        '''
+        word_grams = grams(word)
+        suggestions = []
+        # Nombre de k-grams communs avec chaque mot de longueur proche, complété a chaque distance
+        # par les longueurs pas encore parcourues (len(word) +/- bound)
+        shared_counts = Counter()
+        lengths = set()
+        for bound in range(1, max_distance(word) + 1):
+            for length in range(max(1, len(word) - bound), len(word) + bound + 1):
+                if length in lengths:
+                    continue
+                lengths.add(length)
+                for gram in word_grams:
+                    shared_counts.update(self.postings.get((gram, length), ()))
+
+            # La borne vaut dans les deux sens: pour les k-grams du mot et pour ceux du candidat
+            min_shared = len(word_grams) - (GRAM_SIZE + 1) * bound
+            found = []
+            for word_id, shared in shared_counts.items():
+                candidate_grams = self.grams_counts[word_id]
+                if shared < min_shared or shared < candidate_grams - (GRAM_SIZE + 1) * bound:
+                    continue
+                union = len(word_grams) + candidate_grams - shared
+                if shared / float(union) < MIN_JACCARD:
+                    continue
+                candidate = self.words[word_id]
+                # Les corrections a distance plus petite ont été trouvées au tour précédent
+                if edit_distance(word, candidate, bound) == bound:
+                    found.append((candidate, bound))
+            found.sort(key=lambda suggestion: (-self.frequency(suggestion[0]), suggestion[0]))
+            suggestions += found
+            if len(suggestions) >= count:
+                break
+        return suggestions[:count]
+
+    def correct(self, word):
+        '''
+        Retourne le mot s'il est dans le vocabulaire, sinon sa meilleure correction
+        (ou le mot lui meme sans correction possible)
+        '''
+        if word in self:
+            return word
+        suggestions = self.suggest(word, 1)
+        return suggestions[0][0] if suggestions else word
+
+
+def correct_words(words, index):
+    '''
+    Retourne la liste des mots (processés) ou les mots absents de l'index sont remplacés
+    par leur correction (cf SpellingCorrector.correct)
+    '''
+    corrector = index.spelling_corrector
+    return [corrector.correct(word) for word in words]
+
+
+def query_corrections(query, index):
+    '''
+    Retourne les corrections des mots de la query (vectorielle ou booléenne) absents de l'index,
+    sous la forme {mot de la query: correction (mot processé)}, par exemple pour proposer
+    "paralel -> parallel" a l'utilisateur.
+    Les opérateurs booléens, les mots avec joker et les noms de champ ("author:") sont ignorés.
+    '''
+    corrector = index.spelling_corrector
+    corrections = {}
+    for match in QUERY_WORD.finditer(query):
+        text = match.group()
+        before, after = query[match.start() - 1:match.start()], query[match.end():match.end() + 1]
+        if '*' in (before, after) or after == ':' or text.lower() in RESERVED_WORDS:
+            continue
+        words = index._text_to_words(text)
+        if len(words) != 1:
+            continue
+        correction = corrector.correct(words[0])
+        if correction != words[0]:
+            corrections[text] = correction
+    return corrections
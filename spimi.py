@@ -0,0 +1,250 @@
+# coding=utf-8
+from array import array
+from collections import Counter
+import heapq
+import os
+import shutil
+import sys
+import tempfile
+
+from index import Index
+from term_dictionary import TermDictionary
+
+"""
+Indexation SPIMI (Single-Pass In-Memory Indexing) pour les collections plus grandes que la RAM.
+
+Les documents sont lus un par un. Les postings sont ajoutés directement dans un dictionnaire
+{mot: postings} en mémoire. Quand ce dictionnaire dépasse le budget mémoire, il est trié par mot
+et écrit dans un fichier temporaire (un "run"), puis vidé.
+A la fin, les runs sont fusionnés (k-way merge) en un seul fichier de postings.
+Chaque fichier n'est lu et écrit que séquentiellement.
+
+L'index final est un dossier contenant:
+    - postings: une ligne par mot "mot<TAB>id doc:occurences id doc:occurences ..."
+    - dictionary: une ligne par mot "mot<TAB>dft<TAB>offset<TAB>taille" (position dans postings)
+    - documents: les ids des documents indexés, un par ligne
+"""
+
+POSTINGS_FILE = 'postings'
+DICTIONARY_FILE = 'dictionary'
+DOCUMENTS_FILE = 'documents'
+
+
+class SPIMIIndexer(object):
+    '''
+    Construit un index sur disque dans le dossier `index_path`.
+
+    Arguments:
+        - (str) index_path: dossier ou écrire l'index (créé si besoin)
+        - (int) memory_budget: taille (estimée) en octets des postings gardés en mémoire
+          avant d'écrire un run sur le disque
+        - (str) analyzer: analyseur utilisé pour processer les textes ("nltk" ou "builtin", cf analyzer.py)
+
+    Méthodes utiles:
+        - add_documents(self, documents)
+            -> indexe une liste (ou un générateur) de documents
+        - finalize(self)
+            -> fusionne les runs et renvoie le DiskIndex correspondant
+    '''
+
+    # Estimation de la place prise par un mot et par un posting dans le dictionnaire en mémoire
+    TERM_OVERHEAD = sys.getsizeof(array('i')) + 100  # array + entrée dans le dict
+    POSTING_SIZE = 2 * array('i').itemsize           # id doc + occurences
+
+    def __init__(self, index_path, memory_budget=64 * 10**6, analyzer='nltk'):
+        self.index_path = index_path
+        self.memory_budget = memory_budget
+        self.analyzer = analyzer
+        if not os.path.isdir(index_path):
+            os.makedirs(index_path)
+        self._runs_path = tempfile.mkdtemp(dir=index_path)
+        self._runs = []  # chemins des runs écrits
+
+        # Index vide, utilisé uniquement pour son preprocessing des textes
+        self._analyzer = Index(analyzer=analyzer)
+
+        self._block = {}  # {mot: array [id doc, occurences, id doc, occurences, ...]}
+        self._block_size = 0
+        self._documents = open(os.path.join(index_path, DOCUMENTS_FILE), 'wb')
+
+    def add_documents(self, documents):
+        for document in documents:
+            self.add_document(document)
+
+    def add_document(self, document):
+        '''
+        Ajoute les postings du document au bloc courant (écrit le bloc s'il dépasse le budget)
+        Le document est processé comme par Index (champs processés séparément, cf Index._document_words)
+        '''
+        words = Counter(self._analyzer._document_words(document)[0])
+        for word, count in words.items():
+            postings = self._block.get(word)
+            if postings is None:
+                postings = self._block[word] = array('i')
+                self._block_size += self.TERM_OVERHEAD + sys.getsizeof(word)
+            postings.append(document.id)
+            postings.append(count)
+            self._block_size += self.POSTING_SIZE
+        self._documents.write(('%s\n' % document.id).encode('utf-8'))
+
+        if self._block_size >= self.memory_budget:
+            self._flush_block()
+
+    def _flush_block(self):
+        '''
+        Ecrit le bloc courant, trié par mot, dans un nouveau run et vide le bloc
+        '''
+        if not self._block:
+            return
+        run_path = os.path.join(self._runs_path, 'run-%s' % len(self._runs))
+        with open(run_path, 'wb') as run:
+            for word in sorted(self._block):
+                run.write(_format_postings(word, self._block[word]))
+        self._runs.append(run_path)
+        self._block = {}
+        self._block_size = 0
+
+    def finalize(self):
+        '''
+        Fusionne les runs en un index final et renvoie le DiskIndex correspondant
+        '''
+        self._flush_block()
+        self._documents.close()
+
+        runs = [open(run_path, 'rb') for run_path in self._runs]
+        postings_path = os.path.join(self.index_path, POSTINGS_FILE)
+        dictionary_path = os.path.join(self.index_path, DICTIONARY_FILE)
+        with open(postings_path, 'wb') as postings_file, open(dictionary_path, 'wb') as dictionary:
+            # Les lignes de chaque run sont triées par mot: on fusionne par (mot, numéro du run)
+            # pour que les postings d'un mot restent dans l'ordre d'indexation des documents
+            merged = heapq.merge(*[_read_run(run, number) for number, run in enumerate(runs)])
+            current_word, current_postings = None, []
+            for word, _, postings in merged:
+                if word != current_word and current_word is not None:
+                    self._write_term(postings_file, dictionary, current_word, current_postings)
+                    current_postings = []
+                current_word = word
+                current_postings.append(postings)
+            if current_word is not None:
+                self._write_term(postings_file, dictionary, current_word, current_postings)
+
+        for run in runs:
+            run.close()
+        shutil.rmtree(self._runs_path)
+        return DiskIndex(self.index_path, self.analyzer)
+
+    def _write_term(self, postings_file, dictionary, word, postings):
+        '''
+        Ecrit les postings fusionnés d'un mot et son entrée dans le dictionnaire
+        '''
+        postings = b' '.join(postings)
+        line = word.encode('utf-8') + b'\t' + postings + b'\n'
+        offset = postings_file.tell()
+        postings_file.write(line)
+        dft = postings.count(b' ') + 1
+        dictionary.write(('%s\t%s\t%s\t%s\n' % (word, dft, offset, len(line))).encode('utf-8'))
+
+
+def _format_postings(word, postings):
+    '''
+    Formate une ligne de run "mot<TAB>id doc:occurences ..." (en bytes)
+    '''
+    pairs = ' '.join('%s:%s' % (postings[i], postings[i + 1]) for i in range(0, len(postings), 2))
+    return ('%s\t%s\n' % (word, pairs)).encode('utf-8')
+
+
+def _read_run(run, number):
+    '''
+    Lit séquentiellement un run et génère les triplets (mot, numéro du run, postings en bytes)
+    '''
+    for line in run:
+        word, postings = line.rstrip(b'\n').split(b'\t', 1)
+        yield word.decode('utf-8'), number, postings
+
+
+class DiskIndex(object):
+    '''
+    Index construit par SPIMIIndexer et lu depuis le disque.
+
+    Seul le dictionnaire (mot -> position des postings) et la liste des documents sont chargés
+    en mémoire. Les postings d'un mot sont lus a la demande.
+    L'index expose les memes méthodes que index.Index pour la recherche booléenne
+    (search_word, documents_ids, term_dictionary, _text_to_words, _tokenize) et pour calculer le vecteur
+    d'une query (documents_count, _dft, analyzer).
+    L'analyseur doit etre celui utilisé a l'indexation.
+    '''
+
+    def __init__(self, index_path, analyzer='nltk'):
+        self.index_path = index_path
+        self.analyzer = analyzer
+        # {mot: (dft, offset, taille)}
+        self.dictionary = {}
+        with open(os.path.join(index_path, DICTIONARY_FILE), 'rb') as dictionary:
+            for line in dictionary:
+                word, dft, offset, length = line.decode('utf-8').rstrip('\n').split('\t')
+                self.dictionary[word] = (int(dft), int(offset), int(length))
+        with open(os.path.join(index_path, DOCUMENTS_FILE), 'rb') as documents:
+            self._documents_ids = [int(line) for line in documents]
+        self._postings_file = open(os.path.join(index_path, POSTINGS_FILE), 'rb')
+
+        # Index vide, utilisé pour son preprocessing et ses stop words
+        self._analyzer = Index(analyzer=analyzer)
+        self.stop_words = self._analyzer.stop_words
+        self._term_dictionary = None
+
+    def close(self):
+        self._postings_file.close()
+
+    @property
+    def documents_count(self):
+        return len(self._documents_ids)
+
+    @property
+    def documents_ids(self):
+        return self._documents_ids
+
+    @property
+    def term_dictionary(self):
+        if self._term_dictionary is None:
+            self._term_dictionary = TermDictionary(self.dictionary.keys())
+        return self._term_dictionary
+
+    def _text_to_words(self, text):
+        return self._analyzer._text_to_words(text)
+
+    def _tokenize(self, text):
+        return self._analyzer._tokenize(text)
+
+    def _dft(self, word):
+        return self.dictionary[word][0] if word in self.dictionary else 0
+
+    def postings(self, word):
+        '''
+        Lit les postings du mot sur le disque. Renvoie un dict {id doc: occurences}
+        '''
+        if word not in self.dictionary:
+            return {}
+        _, offset, length = self.dictionary[word]
+        self._postings_file.seek(offset)
+        line = self._postings_file.read(length)
+        postings = line.rstrip(b'\n').split(b'\t', 1)[1]
+        return dict(tuple(int(value) for value in posting.split(b':'))
+                    for posting in postings.split(b' '))
+
+    def search_word(self, word):
+        '''
+        Retourne la liste des ids des documents contenant le mot passé en argument
+        '''
+        # Si le mot est dans les stop_words, on revoit tout les documents
+        if word in self.stop_words:
+            return self.documents_ids
+        return self.postings(word).keys()
+
+
+def build_disk_index(documents, index_path, memory_budget=64 * 10**6, analyzer='nltk'):
+    '''
+    Indexe les documents avec SPIMI dans `index_path` et renvoie le DiskIndex obtenu
+    '''
+    indexer = SPIMIIndexer(index_path, memory_budget, analyzer)
+    indexer.add_documents(documents)
+    return indexer.finalize()
@@ -0,0 +1,234 @@
+# coding=utf-8
+from array import array
+from collections import defaultdict
+import heapq
+from math import sqrt
+
+from vectorial_search import SearchResult, _query_vector
+
+"""
+Rang statique des documents calculé a partir du graphe de citations de la collection.
+
+Le bloc .X de CACM indique seulement que deux documents sont liés (X cite Y ou Y cite X).
+Les ids CACM étant chronologiques, on oriente chaque lien du document le plus récent
+(id le plus grand) vers le plus ancien: c'est forcement le récent qui cite l'ancien.
+
+Le rang statique (PageRank) sert de prior indépendant de la query: les postings peuvent
+etre triés par rang statique décroissant, ce qui permet d'arreter une recherche top-k
+des que plus aucun document restant ne peut entrer dans le top-k.
+"""
+
+
+class CitationGraph(object):
+    '''
+    Graphe de citations creux, stocké en CSR (compressed sparse row):
+    les documents cités par le noeud i sont targets[offsets[i]:offsets[i + 1]]
+    (noeuds numérotés de 0 a nodes_count - 1, cf doc_ids)
+
+    Arguments:
+        - (list) documents: documents de la collection (avec un attribut `links`)
+    '''
+
+    def __init__(self, documents):
+        documents = list(documents)
+        self.doc_ids = sorted(document.id for document in documents)
+        self.ordinals = dict((doc_id, ordinal) for ordinal, doc_id in enumerate(self.doc_ids))
+
+        # Citations {noeud citant: set(noeuds cités)}, en ignorant les liens d'un doc vers lui meme
+        # et les liens vers des documents absents de la collection
+        citations = defaultdict(set)
+        for document in documents:
+            for linked_id in document.links:
+                if linked_id == document.id or linked_id not in self.ordinals:
+                    continue
+                citing, cited = max(document.id, linked_id), min(document.id, linked_id)
+                citations[self.ordinals[citing]].add(self.ordinals[cited])
+
+        self.offsets = array('i', [0])
+        self.targets = array('i')
+        for node in range(self.nodes_count):
+            self.targets.extend(sorted(citations[node]))
+            self.offsets.append(len(self.targets))
+
+    @property
+    def nodes_count(self):
+        return len(self.doc_ids)
+
+    @property
+    def edges_count(self):
+        return len(self.targets)
+
+    def cited_by(self, node):
+        '''
+        Noeuds cités par `node`
+        '''
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def transpose(self):
+        '''
+        Retourne le graphe inverse en CSR, sous forme d'un couple (offsets, sources):
+        les noeuds citant le noeud i sont sources[offsets[i]:offsets[i + 1]]
+        '''
+        in_degrees = array('i', [0] * self.nodes_count)
+        for target in self.targets:
+            in_degrees[target] += 1
+        offsets = array('i', [0] * (self.nodes_count + 1))
+        for node in range(self.nodes_count):
+            offsets[node + 1] = offsets[node] + in_degrees[node]
+
+        sources = array('i', [0] * self.edges_count)
+        position = array('i', offsets[:-1])
+        for node in range(self.nodes_count):
+            for target in self.cited_by(node):
+                sources[position[target]] = node
+                position[target] += 1
+        return offsets, sources
+
+
+def pagerank(graph, damping=0.85, tolerance=1e-10, max_iterations=100):
+    '''
+    Calcule le PageRank des noeuds du graphe par la méthode des puissances.
+    Renvoie un dict {id doc: score} (la somme des scores vaut 1)
+
+    Chaque itération calcule d'un bloc la contribution de chaque noeud (rang / degré sortant),
+    puis le nouveau rang de chaque noeud en sommant les contributions de ses voisins entrants.
+    La masse des noeuds sans citation sortante est redistribuée uniformément.
+    '''
+    count = graph.nodes_count
+    if not count:
+        return {}
+    in_offsets, sources = graph.transpose()
+    out_degrees = [graph.offsets[node + 1] - graph.offsets[node] for node in range(count)]
+    dangling = [node for node in range(count) if not out_degrees[node]]
+
+    ranks = [1.0 / count] * count
+    for _ in range(max_iterations):
+        contributions = [rank / degree if degree else 0.
+                         for rank, degree in zip(ranks, out_degrees)]
+        base = (1 - damping + damping * sum(ranks[node] for node in dangling)) / count
+        new_ranks = [
+            base + damping * sum(contributions[source]
+                                 for source in sources[in_offsets[node]:in_offsets[node + 1]])
+            for node in range(count)
+        ]
+        delta = sum(abs(new - old) for new, old in zip(new_ranks, ranks))
+        ranks = new_ranks
+        if delta < tolerance:
+            break
+
+    return dict((graph.doc_ids[node], rank) for node, rank in enumerate(ranks))
+
+
+class StaticRankIndex(object):
+    '''
+    Index dont les postings sont triés par rang statique décroissant.
+
+    Arguments:
+        - (Index) index: index de la collection
+        - (dict) static_rank: {id doc: score}, par exemple le résultat de pagerank()
+
+    Le rang statique est normalisé dans [0, 1] (divisé par le rang max) pour pouvoir etre combiné
+    avec la similarité cosinus (cf static_rank_search)
+    '''
+
+    def __init__(self, index, static_rank):
+        self.index = index
+        max_rank = max(list(static_rank.values()) or [0]) or 1.
+        # Rang statique normalisé de chaque document, indexé par ordinal
+        self.static_rank = array('d', (static_rank.get(doc_id, 0.) / max_rank
+                                       for doc_id in index.documents_ids))
+
+        # Postings {id mot: [ordinal, ...]} triés par rang statique décroissant
+        order = lambda ordinal: (-self.static_rank[ordinal], ordinal)
+        self.postings = dict((term_id, sorted(postings, key=order))
+                             for term_id, postings in enumerate(index.word_index))
+        # {weight_type: {id mot: impact max}} (cf max_impacts)
+        self._max_impacts = {}
+
+    def max_impacts(self, weight_type):
+        '''
+        Retourne l'impact max de chaque mot ({id mot: impact}): le plus grand poids normalisé
+        (poids / norme du vecteur du document) du mot dans un document.
+        Calculé une seule fois par type de poids (un parcours de tous les postings) puis gardé en cache.
+        '''
+        if weight_type not in self._max_impacts:
+            vectors = self.index.get_document_vectors(weight_type)
+            norms = self.index.get_document_norms(weight_type)
+            impacts = {}
+            for ordinal, vector in enumerate(vectors):
+                if not norms[ordinal]:
+                    continue
+                for term_id, weight in vector.items():
+                    impact = weight / norms[ordinal]
+                    if impact > impacts.get(term_id, 0.):
+                        impacts[term_id] = impact
+            self._max_impacts[weight_type] = impacts
+        return self._max_impacts[weight_type]
+
+    def ranked_postings(self, term_id):
+        '''
+        Générateur des postings du mot, par rang statique décroissant, sous la forme
+        ((-rang statique, ordinal), ordinal): les postings ne sont lus qu'au fur et a mesure
+        '''
+        static_rank = self.static_rank
+        for ordinal in self.postings[term_id]:
+            yield (-static_rank[ordinal], ordinal), ordinal
+
+    def prior(self, doc_id):
+        '''
+        Rang statique (normalisé) du document: prior indépendant de la query
+        '''
+        ordinal = self.index.doc_ordinals.get(doc_id)
+        return self.static_rank[ordinal] if ordinal is not None else 0.
+
+
+def static_rank_search(querystring, static_index, weight_type, k=20, static_weight=0.5):
+    '''
+    Recherche top-k de `querystring`, avec un score = similarité cosinus + static_weight * rang statique.
+
+    Les postings des mots de la query sont parcourus par rang statique décroissant.
+    Le cosinus d'un document est majoré par la somme des impacts max de chaque mot de la query:
+    on s'arrete dès que le k-ième score trouvé dépasse ce majorant plus le rang statique
+    du prochain document, car aucun document restant ne peut alors entrer dans le top-k.
+    '''
+    index = static_index.index
+    query_vector = _query_vector(querystring, index, weight_type)
+    query_vector = dict((term_id, weight) for term_id, weight in query_vector.items()
+                        if weight and term_id in static_index.postings)
+    norm_query = sqrt(sum(weight ** 2 for weight in query_vector.values()))
+    if not norm_query:
+        return []
+
+    vectors = index.get_document_vectors(weight_type)
+    norms = index.get_document_norms(weight_type)
+
+    # Majorant du cosinus d'un document quelconque (impacts max précalculés)
+    max_impacts = static_index.max_impacts(weight_type)
+    max_similarity = sum(weight * max_impacts.get(term_id, 0.) / norm_query
+                         for term_id, weight in query_vector.items())
+
+    # Fusion paresseuse des postings (tous triés par rang statique décroissant): l'arret anticipé
+    # évite de lire la fin des postings
+    merged = heapq.merge(*[static_index.ranked_postings(term_id) for term_id in query_vector])
+
+    top = []  # min-heap des k meilleurs (score, ordinal, similarité)
+    last_doc = None
+    for (minus_rank, _), ordinal in merged:
+        if ordinal == last_doc:  # document présent dans plusieurs postings
+            continue
+        last_doc = ordinal
+        if len(top) == k and top[0][0] >= max_similarity - static_weight * minus_rank:
+            break  # arret anticipé
+        if not norms[ordinal]:
+            continue
+        doc_vector = vectors[ordinal]
+        similarity = sum(weight * doc_vector.get(term_id, 0.) for term_id, weight in query_vector.items())
+        similarity /= norm_query * norms[ordinal]
+        score = similarity + static_weight * static_index.static_rank[ordinal]
+        if len(top) < k:
+            heapq.heappush(top, (score, ordinal, similarity))
+        elif score > top[0][0]:
+            heapq.heapreplace(top, (score, ordinal, similarity))
+
+    return [SearchResult(index.doc_ordinals.key(ordinal), score)
+            for score, ordinal, _ in sorted(top, reverse=True)]
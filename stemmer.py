@@ -0,0 +1,242 @@
+# coding=utf-8
+
+"""
+Stemmer Snowball anglais en pur python.
+
+C'est un portage de nltk.stem.snowball.EnglishStemmer (NLTK, licence Apache 2.0), y compris
+ses petites différences avec l'algorithme de référence, pour que les mots obtenus soient
+exactement les memes qu'avec NLTK, sans avoir a importer NLTK.
+"""
+
+VOWELS = "aeiouy"
+DOUBLE_CONSONANTS = ("bb", "dd", "ff", "gg", "mm", "nn", "pp", "rr", "tt")
+LI_ENDING = "cdeghkmnrt"
+
+STEP0_SUFFIXES = ("'s'", "'s", "'")
+STEP1A_SUFFIXES = ("sses", "ied", "ies", "us", "ss", "s")
+STEP1B_SUFFIXES = ("eedly", "ingly", "edly", "eed", "ing", "ed")
+STEP2_SUFFIXES = ("ization", "ational", "fulness", "ousness", "iveness", "tional", "biliti",
+                  "lessli", "entli", "ation", "alism", "aliti", "ousli", "iviti", "fulli", "enci",
+                  "anci", "abli", "izer", "ator", "alli", "bli", "ogi", "li")
+STEP3_SUFFIXES = ("ational", "tional", "alize", "icate", "iciti", "ative", "ical", "ness", "ful")
+STEP4_SUFFIXES = ("ement", "ance", "ence", "able", "ible", "ment", "ant", "ent", "ism", "ate",
+                  "iti", "ous", "ive", "ize", "ion", "al", "er", "ic")
+
+# Remplacements de suffixes de l'étape 2: {suffixes: (remplacement, R2 si R2 plus court que le suffixe)}
+STEP2_REPLACEMENTS = {
+    ("izer", "ization"): ("ize", ""),
+    ("ational", "ation", "ator"): ("ate", "e"),
+    ("alism", "aliti", "alli"): ("al", ""),
+    ("ousli", "ousness"): ("ous", ""),
+    ("iveness", "iviti"): ("ive", "e"),
+    ("biliti", "bli"): ("ble", ""),
+}
+
+SPECIAL_WORDS = {
+    "skis": "ski", "skies": "sky", "dying": "die", "lying": "lie", "tying": "tie",
+    "idly": "idl", "gently": "gentl", "ugly": "ugli", "early": "earli", "only": "onli",
+    "singly": "singl", "sky": "sky", "news": "news", "howe": "howe", "atlas": "atlas",
+    "cosmos": "cosmos", "bias": "bias", "andes": "andes", "inning": "inning",
+    "innings": "inning", "outing": "outing", "outings": "outing", "canning": "canning",
+    "cannings": "canning", "herring": "herring", "herrings": "herring", "earring": "earring",
+    "earrings": "earring", "proceed": "proceed", "proceeds": "proceed", "proceeded": "proceed",
+    "proceeding": "proceed", "exceed": "exceed", "exceeds": "exceed", "exceeded": "exceed",
+    "exceeding": "exceed", "succeed": "succeed", "succeeds": "succeed", "succeeded": "succeed",
+    "succeeding": "succeed",
+}
+
+
+class EnglishStemmer(object):
+    '''
+    Stemmer Snowball anglais. Les mots déja stemmés sont gardés en cache.
+    '''
+
+    def __init__(self):
+        self._cache = {}
+
+    def stem(self, word):
+        if word not in self._cache:
+            self._cache[word] = stem(word)
+        return self._cache[word]
+
+
+def _cut(word, r1, r2, length):
+    '''
+    Retire `length` lettres a la fin du mot et de ses régions R1 et R2
+    '''
+    return word[:-length], r1[:-length], r2[:-length]
+
+
+def _replace(word, r1, r2, suffix, replacement, r2_default=""):
+    '''
+    Remplace le suffixe du mot et de ses régions R1 et R2
+    (une région plus courte que le suffixe devient "" pour R1 et `r2_default` pour R2)
+    '''
+    word = word[:-len(suffix)] + replacement
+    r1 = r1[:-len(suffix)] + replacement if len(r1) >= len(suffix) else ""
+    r2 = r2[:-len(suffix)] + replacement if len(r2) >= len(suffix) else r2_default
+    return word, r1, r2
+
+
+def _r1r2(word):
+    '''
+    Régions R1 et R2 standards du mot
+    '''
+    r1 = r2 = ""
+    for i in range(1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r1 = word[i + 1:]
+            break
+    for i in range(1, len(r1)):
+        if r1[i] not in VOWELS and r1[i - 1] in VOWELS:
+            r2 = r1[i + 1:]
+            break
+    return r1, r2
+
+
+def stem(word):
+    '''
+    Retourne la racine du mot
+    '''
+    word = word.lower()
+
+    if len(word) <= 2:
+        return word
+    if word in SPECIAL_WORDS:
+        return SPECIAL_WORDS[word]
+
+    word = word.replace(u"’", "'").replace(u"‘", "'").replace(u"‛", "'")
+    if word.startswith("'"):
+        word = word[1:]
+    if word.startswith("y"):
+        word = "Y" + word[1:]
+    for i in range(1, len(word)):
+        if word[i - 1] in VOWELS and word[i] == "y":
+            word = word[:i] + "Y" + word[i + 1:]
+
+    if word.startswith(("gener", "commun", "arsen")):
+        r1 = word[5:] if word.startswith(("gener", "arsen")) else word[6:]
+        r2 = ""
+        for i in range(1, len(r1)):
+            if r1[i] not in VOWELS and r1[i - 1] in VOWELS:
+                r2 = r1[i + 1:]
+                break
+    else:
+        r1, r2 = _r1r2(word)
+
+    # Etape 0
+    for suffix in STEP0_SUFFIXES:
+        if word.endswith(suffix):
+            word, r1, r2 = _cut(word, r1, r2, len(suffix))
+            break
+
+    # Etape 1a
+    for suffix in STEP1A_SUFFIXES:
+        if word.endswith(suffix):
+            if suffix == "sses":
+                word, r1, r2 = _cut(word, r1, r2, 2)
+            elif suffix in ("ied", "ies"):
+                word, r1, r2 = _cut(word, r1, r2, 2 if len(word) - len(suffix) > 1 else 1)
+            elif suffix == "s":
+                if any(letter in VOWELS for letter in word[:-2]):
+                    word, r1, r2 = _cut(word, r1, r2, 1)
+            break
+
+    # Etape 1b
+    for suffix in STEP1B_SUFFIXES:
+        if word.endswith(suffix):
+            if suffix in ("eed", "eedly"):
+                if r1.endswith(suffix):
+                    word, r1, r2 = _replace(word, r1, r2, suffix, "ee")
+            elif any(letter in VOWELS for letter in word[:-len(suffix)]):
+                word, r1, r2 = _cut(word, r1, r2, len(suffix))
+                if word.endswith(("at", "bl", "iz")):
+                    word += "e"
+                    r1 += "e"
+                    if len(word) > 5 or len(r1) >= 3:
+                        r2 += "e"
+                elif word.endswith(DOUBLE_CONSONANTS):
+                    word, r1, r2 = _cut(word, r1, r2, 1)
+                elif (r1 == "" and len(word) >= 3 and word[-1] not in VOWELS
+                      and word[-1] not in "wxY" and word[-2] in VOWELS
+                      and word[-3] not in VOWELS) or (
+                        r1 == "" and len(word) == 2 and word[0] in VOWELS
+                        and word[1] not in VOWELS):
+                    word += "e"
+                    if len(r1) > 0:
+                        r1 += "e"
+                    if len(r2) > 0:
+                        r2 += "e"
+            break
+
+    # Etape 1c
+    if len(word) > 2 and word[-1] in "yY" and word[-2] not in VOWELS:
+        word = word[:-1] + "i"
+        r1 = r1[:-1] + "i" if len(r1) >= 1 else ""
+        r2 = r2[:-1] + "i" if len(r2) >= 1 else ""
+
+    # Etape 2
+    for suffix in STEP2_SUFFIXES:
+        if word.endswith(suffix):
+            if r1.endswith(suffix):
+                if suffix in ("tional", "entli", "fulli", "lessli"):
+                    word, r1, r2 = _cut(word, r1, r2, 2)
+                elif suffix in ("enci", "anci", "abli"):
+                    word = word[:-1] + "e"
+                    r1 = r1[:-1] + "e" if len(r1) >= 1 else ""
+                    r2 = r2[:-1] + "e" if len(r2) >= 1 else ""
+                elif suffix == "fulness":
+                    word, r1, r2 = _cut(word, r1, r2, 4)
+                elif suffix == "ogi":
+                    if word[-4] == "l":
+                        word, r1, r2 = _cut(word, r1, r2, 1)
+                elif suffix == "li":
+                    if word[-3] in LI_ENDING:
+                        word, r1, r2 = _cut(word, r1, r2, 2)
+                else:
+                    for suffixes, (replacement, r2_default) in STEP2_REPLACEMENTS.items():
+                        if suffix in suffixes:
+                            word, r1, r2 = _replace(word, r1, r2, suffix, replacement, r2_default)
+                            break
+            break
+
+    # Etape 3
+    for suffix in STEP3_SUFFIXES:
+        if word.endswith(suffix):
+            if r1.endswith(suffix):
+                if suffix == "tional":
+                    word, r1, r2 = _cut(word, r1, r2, 2)
+                elif suffix == "ational":
+                    word, r1, r2 = _replace(word, r1, r2, suffix, "ate")
+                elif suffix == "alize":
+                    word, r1, r2 = _cut(word, r1, r2, 3)
+                elif suffix in ("icate", "iciti", "ical"):
+                    word, r1, r2 = _replace(word, r1, r2, suffix, "ic")
+                elif suffix in ("ful", "ness"):
+                    word, r1, r2 = _cut(word, r1, r2, len(suffix))
+                elif suffix == "ative" and r2.endswith(suffix):
+                    word, r1, r2 = _cut(word, r1, r2, 5)
+            break
+
+    # Etape 4
+    for suffix in STEP4_SUFFIXES:
+        if word.endswith(suffix):
+            if r2.endswith(suffix):
+                if suffix == "ion":
+                    if word[-4] in "st":
+                        word, r1, r2 = _cut(word, r1, r2, 3)
+                else:
+                    word, r1, r2 = _cut(word, r1, r2, len(suffix))
+            break
+
+    # Etape 5
+    if r2.endswith("l") and word[-2] == "l":
+        word = word[:-1]
+    elif r2.endswith("e"):
+        word = word[:-1]
+    elif r1.endswith("e"):
+        if len(word) >= 4 and (word[-2] in VOWELS or word[-2] in "wxY"
+                               or word[-3] not in VOWELS or word[-4] in VOWELS):
+            word = word[:-1]
+
+    return word.replace("Y", "y")
@@ -0,0 +1,96 @@
+# coding=utf-8
+from bisect import bisect_left
+import re
+
+"""
+Dictionnaire trié des mots d'un index, pour les recherches par joker ("comput*", "*put*", "c*er").
+
+Les mots sont gardés dans une liste triée: les mots commencant par un préfixe donné
+forment une tranche contigue de la liste, trouvée par recherche dichotomique.
+
+Pour les jokers au milieu ou au début d'un mot, on utilise un index "permuterm":
+chaque mot suivi du marqueur de fin $ est stocké sous toutes ses rotations
+(abc -> abc$, bc$a, c$ab, $abc). La recherche X*Y revient alors a chercher les rotations
+commencant par Y$X, qui sont elles aussi contigues dans la liste triée des rotations.
+Toutes les recherches se font donc en temps logarithmique en la taille du vocabulaire
+(plus le nombre de mots trouvés).
+"""
+
+WILDCARD = '*'
+END_MARKER = '$'
+
+
+class TermDictionary(object):
+    '''
+    Dictionnaire trié des mots
+
+    Arguments:
+        - words: les mots (déja processés) du vocabulaire
+    '''
+
+    def __init__(self, words):
+        self.terms = sorted(set(words))
+
+        # Rotations triées des mots, et mot correspondant a chaque rotation
+        rotations = sorted(
+            (rotation, term)
+            for term in self.terms
+            for rotation in _rotations(term + END_MARKER)
+        )
+        self._rotations = [rotation for rotation, _ in rotations]
+        self._rotations_terms = [term for _, term in rotations]
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __contains__(self, word):
+        position = bisect_left(self.terms, word)
+        return position < len(self.terms) and self.terms[position] == word
+
+    def prefix(self, prefix):
+        '''
+        Retourne les mots commencant par `prefix` (triés)
+        '''
+        return _prefix_range(self.terms, prefix, self.terms)
+
+    def match(self, pattern):
+        '''
+        Retourne les mots correspondant a `pattern`, ou * remplace n'importe quelle suite de lettres
+        (triés, sans doublon)
+        '''
+        if WILDCARD not in pattern:
+            return [pattern] if pattern in self else []
+
+        parts = pattern.split(WILDCARD)
+        start, end = parts[0], parts[-1]
+        if len(parts) == 2 and not end:  # X*: simple recherche de préfixe
+            return self.prefix(start)
+
+        # X*Y (ou X*...*Y): on cherche les rotations commencant par Y$X
+        # Pour X*M*Y, les mots contenant M sont aussi ceux dont une rotation commence par M:
+        # on utilise M si ce morceau est plus long (donc plus sélectif) que X et Y réunis
+        key = end + END_MARKER + start
+        longest_middle = max(parts[1:-1], key=len) if len(parts) > 2 else ''
+        if len(longest_middle) > len(start) + len(end):
+            key = longest_middle
+        terms = set(_prefix_range(self._rotations, key, self._rotations_terms))
+        if len(parts) > 2:
+            # Les morceaux du milieu sont vérifiés sur les mots trouvés
+            regex = re.compile('^' + '.*'.join(re.escape(part) for part in parts) + '$')
+            terms = [term for term in terms if regex.match(term)]
+        return sorted(terms)
+
+
+def _rotations(word):
+    return [word[i:] + word[:i] for i in range(len(word))]
+
+
+def _prefix_range(keys, prefix, values):
+    '''
+    Retourne les valeurs correspondant aux clés (triées) commencant par `prefix`
+    La tranche est délimitée par deux recherches dichotomiques
+    '''
+    start = bisect_left(keys, prefix)
+    # u'\uffff' est plus grand que tout caractère d'un mot: fin de la tranche des clés préfixées
+    end = bisect_left(keys, prefix + u'\uffff')
+    return values[start:end]
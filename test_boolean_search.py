@@ -0,0 +1,70 @@
+# coding=utf-8
+import unittest
+
+from index import Index
+from boolean_search import boolean_search
+
+
+class Doc(object):
+    '''
+    Document minimal (id et texte) pour les tests
+    '''
+
+    def __init__(self, doc_id, text):
+        self.id = doc_id
+        self.text = text
+
+
+class ParenthesesTest(unittest.TestCase):
+    '''
+    Les groupes entre parenthèses des queries booléennes
+    '''
+
+    def setUp(self):
+        self.index = Index([Doc(1, 'compiler design'), Doc(2, 'parallel sorting'),
+                            Doc(3, 'sorting compiler'), Doc(4, 'matrix inversion')])
+
+    def test_group_first(self):
+        self.assertEqual(boolean_search('(compiler or parallel) and sorting', self.index), set([2, 3]))
+
+    def test_group_last(self):
+        self.assertEqual(boolean_search('compiler and (design or matrix)', self.index), set([1]))
+
+    def test_nested_groups(self):
+        self.assertEqual(boolean_search('((compiler and design) or matrix) and not sorting', self.index),
+                         set([1, 4]))
+
+
+class NearTest(unittest.TestCase):
+    '''
+    NEAR entre mots, mots avec joker, groupes et autres NEAR
+    '''
+
+    def setUp(self):
+        documents = [Doc(1, 'operating system design'), Doc(2, 'operating the large computer system'),
+                     Doc(3, 'system design for operating'), Doc(4, 'compiler design')]
+        self.index = Index(documents, positional=True)
+        self.non_positional_index = Index(documents)
+
+    def test_words(self):
+        self.assertEqual(boolean_search('operating near/1 system', self.index), set([1]))
+
+    def test_wildcard_and_group(self):
+        self.assertEqual(boolean_search('oper* near/1 system', self.index), set([1]))
+        self.assertEqual(boolean_search('(compiler or operating) near/1 design', self.index), set([3, 4]))
+
+    def test_chained(self):
+        self.assertEqual(boolean_search('operating near/1 system near/1 design', self.index), set([1, 3]))
+
+    def test_non_positional_index(self):
+        self.assertEqual(boolean_search('operating near/1 system', self.non_positional_index), set([1, 2, 3]))
+
+    def test_dangling_near(self):
+        self.assertEqual(boolean_search('near design', self.index), set([1, 3, 4]))
+
+    def test_not_operand(self):
+        self.assertRaises(ValueError, boolean_search, '(not system) near design', self.index)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,43 +1,388 @@
 # coding=utf-8
 
-from collections import namedtuple
+from collections import defaultdict, namedtuple
+import heapq
 from math import sqrt
+import time
 
+from boolean_search import boolean_search
+import dedup
 from index import Index
 from documents import QueryDocument
+import pagination
+from pagination import PAGE_SIZE, SearchPage
+from spelling import correct_words
 
 
 # Un resultat de recherche, couple (document_id, similarité avec la query)
 SearchResult = namedtuple("SearchResult", ['doc_id', 'similarity'])
 
+# On revoie les résultats qui ont une similarité d'au moins 15%
+# J'ai tester differents minimus de similarité et 15% semble etre celui donnant
+# filtrant le mieux les resultats (pour les query de reference du dataset)
+MIN_SIMILARITY = 0.15
 
-def vectorial_search(querystring, collection_index, weight_type):
+# Poids par défaut des champs pour la recherche pondérée par champ (cf field_search)
+# Choisis sur les query de reference du dataset: le résumé compte double, et l'auteur
+# (rarement cité dans les queries) est ignoré
+FIELD_BOOSTS = {'title': 1., 'summary': 2., 'keywords': 1., 'author': 0.}
+# La similarité pondérée par champ est une moyenne de cosinus par champ, plus petits que le cosinus
+# sur le texte entier: le minimum de similarité est donc plus bas
+FIELD_MIN_SIMILARITY = 0.05
+
+# Nombre de postings traités entre deux vérifications du temps restant (cf impact_search)
+DEADLINE_CHECK_POSTINGS = 64
+
+
+def vectorial_search(querystring, collection_index, weight_type, proximity_weight=0,
+                     collapse_duplicates=False, correct_spelling=False):
     '''
     Recherche vectorielle de `querystring` dans `collection_index` en utilisant les poids
     de type `weight_type`. Renvoie les résultats de similarité > 0 (ordonnées par similarité)
+
+    Si `proximity_weight` > 0 (index positionnel uniquement), la similarité des documents
+    ou les mots de la query sont proches est augmentée (cf proximity_boost)
+    Si `collapse_duplicates` (index construit avec duplicates=True), seul le meilleur document
+    de chaque cluster de doublons est renvoyé (cf dedup.py)
+    Si `correct_spelling`, les mots de la query absents de l'index sont remplacés par leur
+    correction (cf spelling.py)
     '''
     search_results = []  # Resultat de la recherche
 
     # On indexe la recherche et on crée son vecteur
-    query_doc = QueryDocument(querystring)
-    query_index = Index([query_doc])
-    # On calcule le vecteur de la query par rappport a l'index de la collection
-    query_vector = query_index.get_document_vector(query_doc.id, weight_type, collection_index)
+    query_vector = _query_vector(querystring, collection_index, weight_type, correct_spelling)
+    if not query_vector:  # aucun mot de la query dans la collection
+        return []
 
     # On calcule la similarité entre la query et chaque document de la collection
-    for doc_id in collection_index.documents_ids:
-        doc_vector = collection_index.get_document_vector(doc_id, weight_type)
+    # (les documents sont parcourus par ordinal, traduit en id a la création du résultat)
+    for ordinal, doc_vector in enumerate(collection_index.get_document_vectors(weight_type)):
         similarity = cosinus_similarity(query_vector, doc_vector)
-        search_result = SearchResult(doc_id, similarity)
+        if proximity_weight and similarity > 0:
+            similarity *= proximity_boost(query_vector, collection_index, ordinal, proximity_weight)
+        search_result = SearchResult(collection_index.doc_ordinals.key(ordinal), similarity)
         search_results.append(search_result)
 
     # On trie nos resultats par ordre decroissant de similarité
     search_results = sorted(search_results, key=lambda result: -result.similarity)
 
-    # On revoie les résultats qui ont une similarité d'au moins 15%
-    # J'ai tester differents minimus de similarité et 15% semble etre celui donnant
-    # filtrant le mieux les resultats (pour les query de reference du dataset)
-    return [result for result in search_results if result.similarity > 0.15]
+    search_results = [result for result in search_results if result.similarity > MIN_SIMILARITY]
+    if collapse_duplicates:
+        search_results = dedup.collapse_duplicates(search_results, collection_index)
+    return search_results
+
+
+def vectorial_search_page(querystring, collection_index, weight_type, page_size=PAGE_SIZE, after=None,
+                          collapse_duplicates=False, correct_spelling=False):
+    '''
+    Page de résultats de la recherche vectorielle (cf vectorial_search): les `page_size` meilleurs
+    résultats qui suivent `after`, le curseur de la page précédente (None pour la premiere page).
+    Renvoie une SearchPage (cf pagination.py) dont le curseur est le dernier résultat de la page
+    (a passer en `after` pour obtenir la page suivante), ou None pour la derniere page.
+
+    Les résultats ne sont jamais triés entierement: seuls les `page_size` meilleurs résultats
+    après le curseur sont sélectionnés (heap). L'ordre est celui de vectorial_search
+    (similarité décroissante, puis ordinal des documents).
+    '''
+    keys = _ranked_keys(querystring, collection_index, weight_type, collapse_duplicates, correct_spelling)
+    if after is not None:
+        after_ordinal = collection_index.doc_ordinals.get(after.doc_id)
+        if after_ordinal is None:
+            raise ValueError("Unknown document: %s" % after.doc_id)
+        after = (-after.similarity, after_ordinal)
+    selected, more = pagination.page(keys, page_size, after)
+    search_results = [SearchResult(collection_index.doc_ordinals.key(ordinal), -similarity)
+                      for similarity, ordinal in selected]
+    return SearchPage(search_results, search_results[-1] if more else None, len(keys))
+
+
+def iter_vectorial_search(querystring, collection_index, weight_type, collapse_duplicates=False,
+                          correct_spelling=False):
+    '''
+    Générateur des résultats de la recherche vectorielle (cf vectorial_search), dans le meme ordre,
+    triés au fur et a mesure qu'ils sont consommés (cf pagination.iter_sorted)
+    '''
+    keys = _ranked_keys(querystring, collection_index, weight_type, collapse_duplicates, correct_spelling)
+    for similarity, ordinal in pagination.iter_sorted(keys):
+        yield SearchResult(collection_index.doc_ordinals.key(ordinal), -similarity)
+
+
+def _ranked_keys(querystring, collection_index, weight_type, collapse_duplicates, correct_spelling):
+    '''
+    Retourne les clés de tri (-similarité, ordinal) des documents de similarité > MIN_SIMILARITY
+    avec la query, non triées. Seuls les documents contenant un mot de la query sont comparés
+    (les autres ont une similarité nulle); les similarités sont celles de vectorial_search.
+    '''
+    query_vector = _query_vector(querystring, collection_index, weight_type, correct_spelling)
+    norm_query = sqrt(sum(weight ** 2 for weight in query_vector.values()))
+    if not norm_query:
+        return []
+
+    candidates = set()
+    for term_id, weight in query_vector.items():
+        if weight:
+            candidates.update(collection_index.word_index[term_id])
+    vectors = collection_index.get_document_vectors(weight_type)
+    norms = collection_index.get_document_norms(weight_type)
+    keys = []
+    for ordinal in candidates:
+        doc_vector = vectors[ordinal]
+        similarity = sum(query_vector[term_id] * doc_vector.get(term_id, 0.) for term_id in query_vector.keys())
+        similarity = similarity / (norm_query * norms[ordinal])
+        if similarity > MIN_SIMILARITY:
+            keys.append((-similarity, ordinal))
+    if collapse_duplicates:
+        keys = dedup.collapse_unsorted(keys, collection_index, lambda key: key[1])
+    return keys
+
+
+def impact_search(querystring, collection_index, weight_type, k=20,
+                  postings_budget=None, time_budget=None):
+    '''
+    Recherche vectorielle "anytime" de `querystring` dans `collection_index`, sur les postings
+    ordonnés par impact (cf Index.get_impact_postings).
+
+    Les segments de postings sont traités par contribution décroissante (score-at-a-time).
+    La recherche s'arrete quand tous les segments ont été traités ou quand un des budgets est épuisé:
+        - `postings_budget`: nombre maximum de postings a traiter
+        - `time_budget`: temps maximum (en secondes) a passer sur les postings
+    Renvoie les `k` meilleurs résultats trouvés (similarité > MIN_SIMILARITY, ordonnés par similarité)
+    '''
+    query_vector = _query_vector(querystring, collection_index, weight_type)
+    norm_query = sqrt(sum(weight ** 2 for weight in query_vector.values()))
+    if not norm_query:
+        return []
+
+    # On récupère les segments des mots de la query, avec leur contribution a la similarité
+    impact_postings = collection_index.get_impact_postings(weight_type)
+    segments = []
+    for term_id, weight in query_vector.items():
+        for impact, ordinals in impact_postings.get(term_id, []):
+            segments.append((weight * impact / norm_query, ordinals))
+    # Les segments les plus importants d'abord
+    segments.sort(key=lambda segment: -segment[0])
+
+    deadline = time.time() + time_budget if time_budget is not None else None
+    remaining = postings_budget
+    similarities = defaultdict(float)  # accumulateurs {ordinal: similarité}
+    out_of_time = False
+    for contribution, ordinals in segments:
+        if remaining is not None:
+            if remaining <= 0:
+                break
+            ordinals = ordinals[:remaining]
+            remaining -= len(ordinals)
+        # Le temps est vérifié tous les DEADLINE_CHECK_POSTINGS postings: un segment peut etre long
+        for start in range(0, len(ordinals), DEADLINE_CHECK_POSTINGS):
+            if deadline is not None and time.time() >= deadline:
+                out_of_time = True
+                break
+            for ordinal in ordinals[start:start + DEADLINE_CHECK_POSTINGS]:
+                similarities[ordinal] += contribution
+        if out_of_time:
+            break
+
+    best = heapq.nlargest(k, similarities.items(), key=lambda item: item[1])
+    return [SearchResult(collection_index.doc_ordinals.key(ordinal), similarity)
+            for ordinal, similarity in best if similarity > MIN_SIMILARITY]
+
+
+def tiered_search(querystring, collection_index, weight_type, k=20, champions_count=None):
+    '''
+    Recherche vectorielle de `querystring` sur les postings découpés en tiers
+    (cf Index.get_tiered_postings).
+
+    On ne compare d'abord la query qu'aux documents des champion lists (tier 1) de ses mots.
+    Le tier 2 n'est consulté que si le tier 1 donne moins de `k` résultats de similarité > MIN_SIMILARITY.
+    Renvoie les `k` meilleurs résultats (ordonnés par similarité)
+    '''
+    query_vector = _query_vector(querystring, collection_index, weight_type)
+    query_vector = dict((term_id, weight) for term_id, weight in query_vector.items() if weight)
+    norm_query = sqrt(sum(weight ** 2 for weight in query_vector.values()))
+    if not norm_query:
+        return []
+
+    tiered_postings = collection_index.get_tiered_postings(weight_type, champions_count)
+    vectors = collection_index.get_document_vectors(weight_type)
+    norms = collection_index.get_document_norms(weight_type)
+
+    search_results = []
+    seen = set()
+    for tier in (0, 1):
+        for term_id in query_vector:
+            for ordinal in tiered_postings.get(term_id, ([], []))[tier]:
+                if ordinal in seen:
+                    continue
+                seen.add(ordinal)
+                doc_vector = vectors[ordinal]
+                similarity = sum(weight * doc_vector.get(other_term, 0.)
+                                 for other_term, weight in query_vector.items())
+                similarity /= norm_query * norms[ordinal]
+                if similarity > MIN_SIMILARITY:
+                    search_results.append(
+                        SearchResult(collection_index.doc_ordinals.key(ordinal), similarity))
+        if len(search_results) >= k:
+            break
+
+    return heapq.nlargest(k, search_results, key=lambda result: result.similarity)
+
+
+def filtered_search(querystring, filter_query, collection_index, weight_type, k=20,
+                    collapse_duplicates=False, correct_spelling=False):
+    '''
+    Recherche hybride: la query booléenne `filter_query` (cf boolean_search) sert de filtre,
+    et seuls les documents qui la satisfont sont comparés a `querystring` avec les poids `weight_type`.
+    Renvoie les `k` meilleurs documents du filtre (ordonnés par similarité, meme nulle: le filtre
+    décide des documents renvoyés, la similarité de leur ordre).
+
+    Le cout du classement est proportionnel au nombre de documents du filtre
+    (les vecteurs et normes des documents sont précalculés par l'index).
+    Si `collapse_duplicates`, seul le meilleur document de chaque cluster de doublons est gardé
+    et si `correct_spelling`, les mots des deux queries sont corrigés (cf vectorial_search).
+    '''
+    candidates = boolean_search(filter_query, collection_index, correct_spelling=correct_spelling)
+    if not candidates:
+        return []
+    query_vector = _query_vector(querystring, collection_index, weight_type, correct_spelling)
+    query_vector = dict((term_id, weight) for term_id, weight in query_vector.items() if weight)
+    norm_query = sqrt(sum(weight ** 2 for weight in query_vector.values()))
+
+    vectors = collection_index.get_document_vectors(weight_type)
+    norms = collection_index.get_document_norms(weight_type)
+    search_results = []
+    for doc_id in candidates:
+        ordinal = collection_index.doc_ordinals.get(doc_id)
+        doc_vector = vectors[ordinal]
+        similarity = sum(weight * doc_vector.get(term_id, 0.) for term_id, weight in query_vector.items())
+        if similarity:
+            similarity /= norm_query * norms[ordinal]
+        search_results.append(SearchResult(doc_id, similarity))
+
+    # A similarité égale, les documents sont ordonnés par id
+    order = lambda result: (-result.similarity, result.doc_id)
+    if collapse_duplicates:
+        search_results = dedup.collapse_duplicates(sorted(search_results, key=order), collection_index)
+    return heapq.nsmallest(k, search_results, key=order)
+
+
+def field_search(querystring, collection_index, weight_type, boosts=None, collapse_duplicates=False,
+                 correct_spelling=False):
+    '''
+    Recherche vectorielle de `querystring` dans `collection_index` pondérée par champ
+    (titre, résumé, ...): la similarité d'un document est la moyenne des similarités cosinus
+    entre la query et chacun de ses champs, pondérée par `boosts` ({champ: poids}, FIELD_BOOSTS
+    par défaut; les champs absents de `boosts` sont ignorés).
+
+    Les poids sont appliqués au moment de la recherche: changer `boosts` ne demande pas de
+    réindexer. Seuls les postings des champs des mots de la query sont parcourus (term-at-a-time).
+    Si `collapse_duplicates`, seul le meilleur document de chaque cluster de doublons est gardé
+    et si `correct_spelling`, les mots de la query sont corrigés (cf vectorial_search).
+    '''
+    if boosts is None:
+        boosts = FIELD_BOOSTS
+    boosts = dict((field, boost) for field, boost in boosts.items()
+                  if boost and field in collection_index.field_index)
+    query_vector = _query_vector(querystring, collection_index, weight_type, correct_spelling)
+    if not query_vector or not boosts:
+        return []
+    norm_query = sqrt(sum(weight ** 2 for weight in query_vector.values()))
+    total_boost = float(sum(boosts.values()))
+
+    scores = defaultdict(float)  # {ordinal: similarité}
+    for field, boost in boosts.items():
+        field_postings = collection_index.field_index[field]
+        vectors = collection_index.get_field_vectors(field, weight_type)
+        norms = collection_index.get_field_norms(field, weight_type)
+        # Produits scalaires query . champ, accumulés mot par mot sur les postings du champ
+        products = defaultdict(float)
+        for term_id, query_weight in query_vector.items():
+            for ordinal in field_postings.get(term_id, ()):
+                products[ordinal] += query_weight * vectors[ordinal].get(term_id, 0.)
+        for ordinal, product in products.items():
+            if norms[ordinal]:
+                scores[ordinal] += boost * product / (norm_query * norms[ordinal])
+
+    search_results = [SearchResult(collection_index.doc_ordinals.key(ordinal), score / total_boost)
+                      for ordinal, score in scores.items()]
+    search_results = sorted(search_results, key=lambda result: -result.similarity)
+    search_results = [result for result in search_results if result.similarity > FIELD_MIN_SIMILARITY]
+    if collapse_duplicates:
+        search_results = dedup.collapse_duplicates(search_results, collection_index)
+    return search_results
+
+
+def similar_documents(doc_id, collection_index, weight_type, k=10, signature_size=None,
+                      collapse_duplicates=False):
+    '''
+    Recherche des documents les plus similaires au document `doc_id` ("more like this").
+    La query est la signature précalculée du document (ses mots de poids le plus fort,
+    cf Index.get_document_signatures): le texte du document n'est pas re-processé, et seuls
+    les postings de ces quelques mots sont parcourus (term-at-a-time).
+    Renvoie les `k` documents (autres que `doc_id`) les plus similaires a la signature
+    (similarité > 0, ordonnés par similarité puis par ordinal).
+    Si `collapse_duplicates`, les doublons du document sont exclus et seul le meilleur document
+    de chaque cluster de doublons est gardé (cf vectorial_search).
+    '''
+    ordinal = collection_index.doc_ordinals.get(doc_id)
+    if ordinal is None:
+        raise ValueError("Unknown document: %s" % doc_id)
+    signature = collection_index.get_document_signatures(weight_type, signature_size)[ordinal]
+    norm_query = sqrt(sum(weight ** 2 for _, weight in signature))
+    if not norm_query:
+        return []
+
+    vectors = collection_index.get_document_vectors(weight_type)
+    norms = collection_index.get_document_norms(weight_type)
+    products = defaultdict(float)  # {ordinal: produit scalaire}
+    for term_id, query_weight in signature:
+        for other in collection_index.word_index[term_id]:
+            products[other] += query_weight * vectors[other][term_id]
+    del products[ordinal]
+
+    scores = [(-product / (norm_query * norms[other]), other) for other, product in products.items()
+              if product > 0 and norms[other]]
+    if collapse_duplicates:
+        # Tri complet (comme vectorial_search); le document lui meme est placé en tete pour que
+        # ses doublons soient écartés avec lui
+        search_results = [SearchResult(collection_index.doc_ordinals.key(other), -score)
+                          for score, other in sorted(scores)]
+        search_results = dedup.collapse_duplicates([SearchResult(doc_id, 1.)] + search_results,
+                                                   collection_index)
+        return search_results[1:k + 1]
+    return [SearchResult(collection_index.doc_ordinals.key(other), -score)
+            for score, other in heapq.nsmallest(k, scores)]
+
+
+def proximity_boost(query_vector, collection_index, ordinal, proximity_weight):
+    '''
+    Facteur multiplicatif de la similarité selon la proximité des mots de la query dans le document:
+    1 + proximity_weight * (nombre de mots de la query trouvés / taille de la plus petite fenetre
+    les contenant tous). Vaut 1 si le document contient moins de deux mots de la query,
+    et 1 + proximity_weight si ces mots se suivent.
+    '''
+    term_ids = [term_id for term_id, weight in query_vector.items() if weight]
+    found, window = collection_index.proximity_window(term_ids, ordinal)
+    if found < 2:
+        return 1
+    return 1 + proximity_weight * found / float(window)
+
+
+def _query_vector(querystring, collection_index, weight_type, correct_spelling=False):
+    '''
+    Indexe la query et renvoie son vecteur de poids
+    (calculé par rappport a l'index de la collection, et exprimé avec les ids de mots de la collection:
+    les mots absents de la collection, de poids nul, sont ignorés, ou corrigés si `correct_spelling`)
+    '''
+    words = None
+    if correct_spelling:
+        # Les mots sont corrigés une fois processés: une correction (processée) réécrite dans
+        # le texte pourrait etre processée a nouveau en un autre mot
+        words = correct_words(collection_index._text_to_words(querystring), collection_index)
+    query_doc = QueryDocument(querystring, words)
+    # La query est processée avec le meme analyseur que la collection
+    query_index = Index([query_doc], analyzer=collection_index.analyzer)
+    query_vector = query_index.get_document_vector(query_doc.id, weight_type, collection_index)
+    return collection_index.vocabulary.translate(query_vector, query_index.vocabulary)
 
 
 def cosinus_similarity(query_vector, doc_vector):
@@ -50,7 +395,7 @@ def cosinus_similarity(query_vector, doc_vector):
 
     # On itere sur les mots de la query plutot que sur ceux du documents
     # car cette liste est generalement plus courte
-    similarity = sum(query_vector[word] * doc_vector[word] for word in query_vector.keys())
+    similarity = sum(query_vector[word] * doc_vector.get(word, 0.) for word in query_vector.keys())
     similarity = similarity / (norm_query * norm_doc)
 
     return similarity
@@ -0,0 +1,70 @@
+# coding=utf-8
+
+"""
+Tables d'interning de l'index.
+
+Chaque mot (déja processé) et chaque id de document recoit, a l'indexation, un entier dense
+(0, 1, 2, ...): son "id de mot" ou son "ordinal" de document.
+Les postings, vecteurs, caches et algorithmes de recherche ne manipulent que ces entiers
+(hachage et comparaisons plus rapides, moins de mémoire, structures indexées par liste ou array).
+La traduction mot <-> id de mot et id de document <-> ordinal ne se fait qu'aux bords de l'API:
+a l'analyse de la query et au renvoi des résultats.
+"""
+
+
+class Vocabulary(object):
+    '''
+    Associe a chaque clé (mot ou id de document) un entier dense, dans l'ordre d'ajout
+
+    Arguments:
+        - keys: optionel, clés initiales
+    '''
+
+    def __init__(self, keys=()):
+        self._ids = {}  # {clé: id}
+        self.keys = []  # clé de chaque id
+        for key in keys:
+            self.add(key)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._ids
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def add(self, key):
+        '''
+        Retourne l'id de la clé, en lui attribuant le prochain id libre si elle est nouvelle
+        '''
+        key_id = self._ids.get(key)
+        if key_id is None:
+            key_id = self._ids[key] = len(self.keys)
+            self.keys.append(key)
+        return key_id
+
+    def get(self, key, default=None):
+        '''
+        Retourne l'id de la clé (`default` si la clé est inconnue)
+        '''
+        return self._ids.get(key, default)
+
+    def key(self, key_id):
+        '''
+        Retourne la clé correspondant a l'id
+        '''
+        return self.keys[key_id]
+
+    def translate(self, mapping, vocabulary):
+        '''
+        Traduit un dict {id dans `vocabulary`: valeur} en dict {id dans ce vocabulaire: valeur}
+        (les clés absentes de ce vocabulaire sont ignorées)
+        '''
+        translated = {}
+        for key_id, value in mapping.items():
+            own_id = self._ids.get(vocabulary.keys[key_id])
+            if own_id is not None:
+                translated[own_id] = value
+        return translated